@@ -17,7 +17,6 @@ settings = get_settings()
 config = context.config
 
 # set actual database uri
-print(settings.database_uri_async)
 config.set_main_option('sqlalchemy.url', settings.database_uri_async)
 
 # Interpret the config file for Python logging.
@@ -0,0 +1,27 @@
+"""task counters version
+
+Revision ID: 2a8d6c4e0f19
+Revises: e71b3d5a9f02
+Create Date: 2026-10-18 21:52:08.671342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2a8d6c4e0f19'
+down_revision = 'e71b3d5a9f02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'task_counters',
+        sa.Column('version', sa.BIGINT(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('task_counters', 'version')
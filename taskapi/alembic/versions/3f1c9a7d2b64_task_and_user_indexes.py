@@ -0,0 +1,51 @@
+"""task and user indexes
+
+Revision ID: 3f1c9a7d2b64
+Revises: ca26993fb76e
+Create Date: 2026-10-18 10:12:41.503218
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b64'
+down_revision = 'ca26993fb76e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY doesn't lock the table for writes,
+    # but it can't be run inside a transaction block.
+    # If users.email has duplicates, unique index build fails,
+    # duplicates must be removed before the migration.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix__tasks__user_id_id'), 'tasks', ['user_id', 'id'],
+            unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            op.f('ix__tasks__user_id_created_at_id'), 'tasks', ['user_id', 'created_at', 'id'],
+            unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            op.f('ix__users__email'), 'users', ['email'],
+            unique=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix__users__email'), table_name='users',
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            op.f('ix__tasks__user_id_created_at_id'), table_name='tasks',
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            op.f('ix__tasks__user_id_id'), table_name='tasks',
+            postgresql_concurrently=True
+        )
@@ -0,0 +1,37 @@
+"""task idempotency key
+
+Revision ID: 5d7a1e93c0b2
+Revises: 8b2e4f0c1d57
+Create Date: 2026-10-18 12:41:05.917364
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7a1e93c0b2'
+down_revision = '8b2e4f0c1d57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('tasks', sa.Column('idempotency_key', sa.VARCHAR(length=64), nullable=True))
+
+    # CREATE INDEX CONCURRENTLY can't be run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix__tasks__user_id_idempotency_key'), 'tasks', ['user_id', 'idempotency_key'],
+            unique=True, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix__tasks__user_id_idempotency_key'), table_name='tasks',
+            postgresql_concurrently=True
+        )
+
+    op.drop_column('tasks', 'idempotency_key')
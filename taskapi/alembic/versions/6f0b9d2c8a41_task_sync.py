@@ -0,0 +1,55 @@
+"""task sync
+
+Revision ID: 6f0b9d2c8a41
+Revises: 2a8d6c4e0f19
+Create Date: 2026-10-18 22:31:54.207816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f0b9d2c8a41'
+down_revision = '2a8d6c4e0f19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Column with constant default is added without table rewrite.
+    # Existing tasks have version 0, so they are older than any sync token.
+    op.add_column(
+        'tasks',
+        sa.Column('sync_version', sa.BIGINT(), server_default='0', nullable=False)
+    )
+    op.create_table(
+        'task_tombstones',
+        sa.Column('user_id', sa.INTEGER(), nullable=False),
+        sa.Column('version', sa.BIGINT(), nullable=False),
+        sa.Column('task_id', sa.INTEGER(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['user_id'], ['users.id'],
+            name=op.f('fk__task_tombstones__user_id__users'), ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('user_id', 'version', 'task_id', name=op.f('pk__task_tombstones')),
+    )
+
+    # CREATE INDEX CONCURRENTLY can't be run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            op.f('ix__tasks__user_id_sync_version_id'), 'tasks', ['user_id', 'sync_version', 'id'],
+            unique=False, postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            op.f('ix__tasks__user_id_sync_version_id'), table_name='tasks',
+            postgresql_concurrently=True
+        )
+
+    op.drop_table('task_tombstones')
+    op.drop_column('tasks', 'sync_version')
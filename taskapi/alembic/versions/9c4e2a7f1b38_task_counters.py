@@ -0,0 +1,44 @@
+"""task counters
+
+Revision ID: 9c4e2a7f1b38
+Revises: 5d7a1e93c0b2
+Create Date: 2026-10-18 20:45:12.384519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e2a7f1b38'
+down_revision = '5d7a1e93c0b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'task_counters',
+        sa.Column('user_id', sa.INTEGER(), nullable=False),
+        sa.Column('total', sa.INTEGER(), server_default='0', nullable=False),
+        sa.Column('done', sa.INTEGER(), server_default='0', nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ['user_id'], ['users.id'],
+            name=op.f('fk__task_counters__user_id__users'), ondelete='CASCADE'
+        ),
+        sa.PrimaryKeyConstraint('user_id', name=op.f('pk__task_counters')),
+    )
+
+    # Backfill counters of existing tasks.
+    # Tasks changed by the previous version of the application after this statement
+    # aren't counted, so the migration must be applied together with the release.
+    op.execute(
+        "INSERT INTO task_counters (user_id, total, done, updated_at) "
+        "SELECT user_id, count(*), sum(CASE WHEN is_done THEN 1 ELSE 0 END), now() "
+        "FROM tasks GROUP BY user_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('task_counters')
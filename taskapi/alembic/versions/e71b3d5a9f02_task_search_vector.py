@@ -0,0 +1,48 @@
+"""task search vector
+
+Revision ID: e71b3d5a9f02
+Revises: 9c4e2a7f1b38
+Create Date: 2026-10-18 21:20:37.905126
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71b3d5a9f02'
+down_revision = '9c4e2a7f1b38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # btree_gin allows GIN index on (user_id, search_vector),
+    # so search is limited to user's tasks by the index
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+
+    # Generated column is updated by PostgreSQL on every insert and update.
+    # Adding a stored column rewrites the table under exclusive lock.
+    # Text search config must be the same as SEARCH_TEXT_CONFIG of tasks endpoints.
+    op.execute(
+        "ALTER TABLE tasks ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"
+        ") STORED"
+    )
+
+    # CREATE INDEX CONCURRENTLY can't be run inside a transaction block
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix__tasks__user_id_search_vector', 'tasks', ['user_id', 'search_vector'],
+            unique=False, postgresql_using='gin', postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix__tasks__user_id_search_vector', table_name='tasks',
+            postgresql_concurrently=True
+        )
+
+    op.drop_column('tasks', 'search_vector')
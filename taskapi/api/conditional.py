@@ -0,0 +1,75 @@
+"""
+Helpers of HTTP conditional requests (RFC 7232):
+ETag / Last-Modified validators and If-None-Match / If-Modified-Since / If-Match headers.
+"""
+import datetime as dt
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi.responses import Response
+from starlette.datastructures import Headers
+
+
+def _as_utc(value: dt.datetime) -> dt.datetime:
+    # naive datetimes from the database are in UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=dt.timezone.utc)
+    return value.astimezone(dt.timezone.utc)
+
+
+def format_http_date(value: dt.datetime) -> str:
+    return format_datetime(_as_utc(value), usegmt=True)
+
+
+def parse_http_date(value: str | None) -> dt.datetime | None:
+    if value is None:
+        return None
+    try:
+        return _as_utc(parsedate_to_datetime(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_etags(header: str) -> list[str]:
+    """ Split If-Match / If-None-Match header into entity tags, "*" is kept as is """
+    return [etag.strip() for etag in header.split(",") if etag.strip()]
+
+
+def _strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(headers: Headers, etag: str | None, last_modified: dt.datetime | None = None) -> bool:
+    """
+    Check if client's copy is still valid, so 304 can be returned.
+    If-Modified-Since is used only without If-None-Match.
+    """
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        return etag is not None and ("*" in etags or _strip_weak(etag) in map(_strip_weak, etags))
+
+    if_modified_since = parse_http_date(headers.get("If-Modified-Since"))
+    if if_modified_since is not None and last_modified is not None:
+        # HTTP dates have seconds precision
+        return _as_utc(last_modified).replace(microsecond=0) <= if_modified_since
+    return False
+
+
+def get_validator_headers(etag: str | None, last_modified: dt.datetime | None = None) -> dict:
+    """
+    Headers of responses which may be revalidated.
+    Responses depend on the user, so they must be revalidated by private caches only.
+    """
+    headers = {
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if etag is not None:
+        headers["ETag"] = etag
+    if last_modified is not None:
+        headers["Last-Modified"] = format_http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str | None, last_modified: dt.datetime | None = None) -> Response:
+    return Response(status_code=304, headers=get_validator_headers(etag, last_modified))
@@ -0,0 +1,101 @@
+import math
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import get_settings
+from db.instrumentation import QueryStats, current_query_stats
+from db.replicas import LAST_WRITE_COOKIE
+from metrics import Metrics, UNMATCHED_ROUTE, metrics
+
+
+def _is_event_stream(message: Message) -> bool:
+    for name, value in message.get("headers", ()):
+        if name.lower() == b"content-type":
+            return value.startswith(b"text/event-stream")
+    return False
+
+
+class MetricsMiddleware:
+    """
+    Record duration, number of database queries and their duration for every request.
+    Pure ASGI middleware is used, because BaseHTTPMiddleware adds noticeable overhead.
+    Requests are labeled by route path template, not by actual path,
+    so the number of series doesn't grow with ids in paths.
+    Server-sent event streams live as long as clients are connected,
+    they are not counted once the response starts.
+    """
+
+    def __init__(self, app: ASGIApp, registry: Metrics = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        is_stream = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code, is_stream
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if _is_event_stream(message):
+                    is_stream = True
+                    self.registry.requests_in_flight -= 1
+            await send(message)
+
+        query_stats = QueryStats()
+        token = current_query_stats.set(query_stats)
+        self.registry.requests_in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            current_query_stats.reset(token)
+            if not is_stream:
+                self.registry.requests_in_flight -= 1
+                # route is set to the scope by the router when the request matches it
+                route = scope.get("route")
+                self.registry.observe_request(
+                    method=scope["method"],
+                    route=getattr(route, "path", UNMATCHED_ROUTE),
+                    status_code=status_code,
+                    duration=duration,
+                    db_queries=query_stats.count,
+                    db_duration=query_stats.duration,
+                )
+
+
+class ReadYourWritesMiddleware:
+    """
+    Return time of the writes committed by the request in LAST_WRITE_COOKIE,
+    client's reads go to primary until the cookie expires.
+    Client keeps the marker, so it works with any number of workers and hosts.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        window_seconds = get_settings().DATABASE_READ_YOUR_WRITES_SECONDS
+        if scope["type"] != "http" or window_seconds <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # set by the session after commit, see db.replicas.track_writes
+                last_write_at = scope.get("state", {}).get("last_write_at")
+                if last_write_at is not None:
+                    cookie = (
+                        f"{LAST_WRITE_COOKIE}={last_write_at:.3f}; Max-Age={math.ceil(window_seconds)}; "
+                        f"Path=/; HttpOnly; SameSite=lax"
+                    )
+                    message = {**message, "headers": [*message.get("headers", ()), (b"set-cookie", cookie.encode())]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,11 +1,12 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import User
 from db.session import get_session
-from .utils import authenticate_user, create_access_token, get_user
+from .utils import authenticate_user, create_user_access_token, get_user, invalidate_user_tokens
 
 from .config import API_PREFIX, TOKEN_URL
 from .schemas import UserData, Token, RegistrationData
@@ -28,10 +29,11 @@ router = APIRouter(prefix=API_PREFIX, tags=["Auth"])
 )
 async def login_for_access_token(
         user_data: UserData,
-        session: Annotated[AsyncSession, Depends(get_session)]
+        session: Annotated[AsyncSession, Depends(get_session)],
+        background_tasks: BackgroundTasks,
 ):
-    user = await authenticate_user(session, user_data.email, user_data.password)
-    access_token = create_access_token({"email": user.email})
+    user = await authenticate_user(session, user_data.email, user_data.password, background_tasks)
+    access_token = create_user_access_token(user)
     return Token(
         access_token=access_token,
         token_type="bearer"
@@ -63,6 +65,17 @@ async def signup(
     user = User(
         email=reg_data.email,
     )
-    user.set_password(reg_data.password)
+    await user.set_password_async(reg_data.password)
     session.add(user)
-    await session.commit()
+    try:
+        await session.commit()
+    except IntegrityError:
+        # user with the same email was registered concurrently
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="User already exists",
+        )
+    if session.get_bind().dialect.name != "postgresql":
+        # SQLite may reuse id of a deleted user, drop anything cached about it
+        invalidate_user_tokens(user.id)
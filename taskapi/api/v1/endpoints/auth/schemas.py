@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 
 class UserData(BaseModel):
@@ -14,3 +14,12 @@ class Token(BaseModel):
 class RegistrationData(BaseModel):
     email: str
     password: str
+
+
+class Principal(BaseModel):
+    """ Authenticated user taken from verified token claims """
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    email: str | None = None
+    token_version: int | None = None
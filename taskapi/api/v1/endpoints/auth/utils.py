@@ -1,23 +1,41 @@
 import datetime as dt
+import hashlib
+import logging
+import time
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.models import User
 from db.session import get_session
+from db.utils import generate_password_hash_async
 from config import get_settings
 
 from api.v1.config import API_PREFIX as API_PREFIX_V1
 
+from .cache import TTLCache, MISSING
 from .config import ALGORITHM, TOKEN_URL, API_PREFIX as API_PREFIX_AUTH
+from .schemas import Principal
+
+logger = logging.getLogger(__name__)
 
-settings = get_settings()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{API_PREFIX_V1}{API_PREFIX_AUTH}{TOKEN_URL}")
 
+# user.id -> user.token_version, None if user doesn't exist
+token_version_cache = TTLCache(
+    maxsize=get_settings().TOKEN_VERSION_CACHE_SIZE,
+    ttl=get_settings().TOKEN_VERSION_CACHE_TTL_SECONDS,
+)
+# sha256 of token -> Principal decoded from it
+token_cache = TTLCache(
+    maxsize=get_settings().TOKEN_CACHE_SIZE,
+    ttl=get_settings().TOKEN_CACHE_TTL_SECONDS,
+)
+
 
 async def get_user(session: AsyncSession, email: str) -> User | None:
     stmt = select(User).where(User.email == email).limit(1)
@@ -25,60 +43,173 @@ async def get_user(session: AsyncSession, email: str) -> User | None:
     return result.scalar_one_or_none()
 
 
-async def authenticate_user(session: AsyncSession, email: str, password: str) -> User:
+async def upgrade_password_hash(
+        session: AsyncSession,
+        user_id: int,
+        old_password_hash: str,
+        password: str,
+) -> None:
+    """
+    Rehash password with actual format and cost.
+    Hash is not changed if it was changed by someone else since login.
+    """
+    try:
+        new_password_hash = await generate_password_hash_async(password)
+        stmt = (
+            update(User)
+            .where(User.id == user_id, User.password_hash == old_password_hash)
+            .values(password_hash=new_password_hash)
+        )
+        await session.execute(stmt)
+        await session.commit()
+    except Exception:
+        # the user is already logged in, failed upgrade will be retried on next login
+        logger.exception("Cannot upgrade password hash of user %s", user_id)
+        await session.rollback()
+
+
+async def authenticate_user(
+        session: AsyncSession,
+        email: str,
+        password: str,
+        background_tasks: BackgroundTasks | None = None,
+) -> User:
+    """
+    Find user by email and check the password.
+    If background_tasks are passed, outdated password hash is upgraded after the response.
+    """
     user = await get_user(session, email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cannot find the user",
         )
-    if not user.check_password(password):
+    if not await user.check_password_async(password):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Incorrect password",
         )
+    if background_tasks is not None and user.password_needs_rehash():
+        background_tasks.add_task(
+            upgrade_password_hash, session, user.id, user.password_hash, password,
+        )
     return user
 
 
 def create_access_token(payload: dict, expires_delta: dt.timedelta | None = None) -> str:
     if expires_delta is None:
-        expires_delta = dt.timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expires_delta = dt.timedelta(minutes=get_settings().ACCESS_TOKEN_EXPIRE_MINUTES)
     expire = dt.datetime.utcnow() + expires_delta
 
     to_encode = payload.copy()
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, get_settings().SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+def create_user_access_token(user: User, expires_delta: dt.timedelta | None = None) -> str:
+    """
+    Create access token with claims enough to authorize requests without user lookup
+    """
+    payload = {
+        "sub": str(user.id),
+        "email": user.email,
+        "ver": user.token_version,
+    }
+    return create_access_token(payload, expires_delta)
+
+
 def decode_token(token: str) -> dict:
     # JWTError will be raised if token is invalid, including expired
-    decoded_token = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    decoded_token = jwt.decode(token, get_settings().SECRET_KEY, algorithms=[ALGORITHM])
     return decoded_token
 
 
-async def get_current_user(
+async def get_token_version(session: AsyncSession, user_id: int) -> int | None:
+    """
+    Get actual token version of the user, None if user doesn't exist.
+    Cached for TOKEN_VERSION_CACHE_TTL_SECONDS.
+    """
+    token_version = token_version_cache.get(user_id)
+    if token_version is MISSING:
+        stmt = select(User.token_version).where(User.id == user_id).limit(1)
+        token_version = await session.scalar(stmt)
+        token_version_cache.set(user_id, token_version)
+    return token_version
+
+
+def invalidate_token_version(user_id: int) -> None:
+    """
+    Drop cached token version of the user.
+    Call it after user is deleted or its tokens are revoked.
+    """
+    token_version_cache.pop(user_id)
+
+
+def invalidate_user_tokens(user_id: int) -> None:
+    """
+    Drop everything cached about user's tokens.
+    It scans the whole token cache, call it only when user id can be reused.
+    """
+    invalidate_token_version(user_id)
+    token_cache.pop_where(lambda principal: principal.id == user_id)
+
+
+async def _get_principal_from_payload(session: AsyncSession, payload: dict) -> Principal | None:
+    if "sub" not in payload:
+        # token issued before user id was added to claims
+        email = payload.get("email")
+        if not email:
+            return None
+        user = await get_user(session, email)
+        if not user:
+            return None
+        return Principal.model_validate(user)
+
+    try:
+        return Principal(
+            id=payload["sub"],
+            email=payload.get("email"),
+            token_version=payload.get("ver"),
+        )
+    except ValueError:
+        return None
+
+
+async def get_current_principal(
         session: Annotated[AsyncSession, Depends(get_session)],
         token: Annotated[str, Depends(oauth2_scheme)]
-) -> User:
+) -> Principal:
+    """
+    Authorize request by token claims.
+    Decoded tokens are cached until they expire,
+    database is queried only to check token version when it's not cached.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = decode_token(token)
-    except JWTError:
-        raise credentials_exception
-
-    email = payload.get("email")
-    if not email:
-        raise credentials_exception
-    user = await get_user(session, email)
-    if not user:
+    token_digest = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    principal = token_cache.get(token_digest)
+    if principal is MISSING:
+        try:
+            payload = decode_token(token)
+        except JWTError:
+            raise credentials_exception
+
+        principal = await _get_principal_from_payload(session, payload)
+        if principal is None:
+            raise credentials_exception
+        # cached token must not outlive its "exp" claim
+        ttl = payload["exp"] - time.time() if "exp" in payload else None
+        token_cache.set(token_digest, principal, ttl=ttl)
+
+    token_version = await get_token_version(session, principal.id)
+    if token_version is None or token_version != principal.token_version:
         raise credentials_exception
 
-    return user
+    return principal
 
 
 def get_authorization_headers(access_token, token_type="bearer") -> dict:
@@ -1 +1,2 @@
 API_PREFIX = "/health"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
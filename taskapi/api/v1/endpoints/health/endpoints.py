@@ -1,13 +1,16 @@
 from typing import Annotated
 
 from fastapi import APIRouter, status, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.session import get_session
+from db.session import get_session, SessionManager
+from db.utils import PasswordHasher
 
-from .config import API_PREFIX
-from .schemas import PingResponse
-from .utils import health_check_db
+from .config import API_PREFIX, PROMETHEUS_CONTENT_TYPE
+from .schemas import PingResponse, PoolStatus, ReplicaStatus, PasswordHasherStatus, AuthCacheStatus
+from .utils import health_check_db, render_app_metrics
+from ..auth.utils import token_cache, token_version_cache
 
 router = APIRouter(prefix=API_PREFIX, tags=["Health"])
 
@@ -42,3 +45,55 @@ async def ping_db(session: Annotated[AsyncSession, Depends(get_session)]):
         status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
         detail="Database isn't working(",
     )
+
+
+@router.get(
+    "/db_pool",
+    response_model=PoolStatus,
+    status_code=status.HTTP_200_OK,
+)
+async def db_pool_status():
+    return PoolStatus(**SessionManager().get_pool_status())
+
+
+@router.get(
+    "/db_replicas",
+    response_model=list[ReplicaStatus],
+    status_code=status.HTTP_200_OK,
+)
+async def db_replicas_status():
+    return [ReplicaStatus(**replica) for replica in SessionManager().get_replicas_status()]
+
+
+@router.get(
+    "/password_hasher",
+    response_model=PasswordHasherStatus,
+    status_code=status.HTTP_200_OK,
+)
+async def password_hasher_status():
+    return PasswordHasherStatus(**PasswordHasher().get_status())
+
+
+@router.get(
+    "/auth_cache",
+    response_model=AuthCacheStatus,
+    status_code=status.HTTP_200_OK,
+)
+async def auth_cache_status():
+    return AuthCacheStatus(
+        tokens=token_cache.get_stats(),
+        token_versions=token_version_cache.get_stats(),
+    )
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def app_metrics():
+    """ Metrics of this process in Prometheus text format """
+    return PlainTextResponse(
+        render_app_metrics(),
+        media_type=PROMETHEUS_CONTENT_TYPE,
+    )
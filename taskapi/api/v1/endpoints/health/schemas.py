@@ -3,3 +3,42 @@ from pydantic import BaseModel
 
 class PingResponse(BaseModel):
     message: str
+
+
+class PoolStatus(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+
+
+class ReplicaStatus(BaseModel):
+    host: str | None
+    healthy: bool
+    checked_out: int
+
+
+class PasswordHasherStatus(BaseModel):
+    workers: int
+    max_concurrency: int
+    waiting: int
+    in_flight: int
+    # in_flight jobs waiting for a free thread and running ones
+    queued: int
+    running: int
+    completed: int
+
+
+class CacheStatus(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    removals: int
+
+
+class AuthCacheStatus(BaseModel):
+    tokens: CacheStatus
+    token_versions: CacheStatus
@@ -1,6 +1,11 @@
 from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from db.session import SessionManager
+from db.utils import PasswordHasher
+from events import BrokerManager
+from metrics import metrics, render_metrics, render_gauge
+
 
 async def health_check_db(session: AsyncSession) -> bool:
     health_check_query = select(text("1"))
@@ -9,3 +14,39 @@ async def health_check_db(session: AsyncSession) -> bool:
         return result is not None
     except Exception:
         return False
+
+
+def render_app_metrics() -> str:
+    """
+    Render collected metrics together with current state
+    of the connection pool, the password hasher and the task events broker
+    """
+    pool_status = SessionManager().get_pool_status()
+    password_hasher_status = PasswordHasher().get_status()
+    lines = [
+        *render_metrics(metrics),
+        *render_gauge(
+            "db_pool_connections",
+            "Number of connections in the pool by state",
+            [
+                ({"state": "checked_in"}, pool_status["checked_in"]),
+                ({"state": "checked_out"}, pool_status["checked_out"]),
+                ({"state": "overflow"}, pool_status["overflow"]),
+            ],
+        ),
+        *render_gauge(
+            "password_hasher_jobs",
+            "Number of password hashing jobs by state",
+            [
+                ({"state": "waiting"}, password_hasher_status["waiting"]),
+                ({"state": "queued"}, password_hasher_status["queued"]),
+                ({"state": "running"}, password_hasher_status["running"]),
+            ],
+        ),
+        *render_gauge(
+            "task_event_subscribers",
+            "Number of open task event streams",
+            [({}, BrokerManager().broker.subscribers_count)],
+        ),
+    ]
+    return "\n".join(lines) + "\n"
@@ -1 +1,35 @@
 API_PREFIX = "/tasks"
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+MAX_BATCH_SIZE = 1000
+
+# number of rows fetched from server-side cursor and sent at once during export
+EXPORT_CHUNK_SIZE = 1000
+
+# number of valid rows inserted at once during import
+IMPORT_BATCH_SIZE = 5000
+# number of invalid lines reported in import result, the rest are only counted
+MAX_IMPORT_ERRORS = 100
+# limits of one CSV record, a quoted value left unclosed must not make the whole file one record;
+# description may consist of line breaks only, and quotes are doubled inside quoted values
+MAX_CSV_RECORD_LINES = 2100
+MAX_CSV_RECORD_LENGTH = 8 * 1024
+
+# window of GET /tasks/stats created_in_window count
+DEFAULT_STATS_WINDOW_HOURS = 24
+MAX_STATS_WINDOW_HOURS = 24 * 31
+
+# text search configuration of tasks.search_vector column, must be the same as in migration
+SEARCH_TEXT_CONFIG = "simple"
+MAX_SEARCH_QUERY_LENGTH = 200
+
+# sync tokens of GET /tasks/changes older than this are rejected, client must get all tasks again
+SYNC_TOKEN_MAX_AGE_DAYS = 30
+# tombstones of deleted tasks are kept a bit longer than sync tokens live
+TOMBSTONE_RETENTION_DAYS = SYNC_TOKEN_MAX_AGE_DAYS + 1
+# share of deletes which also remove user's old tombstones, so cleanup doesn't run on every delete
+TOMBSTONE_CLEANUP_RATE = 0.01
@@ -1,24 +1,81 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select, delete
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, insert, delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.models import User, Task
-from db.session import get_session
+from api.conditional import is_not_modified, get_validator_headers, not_modified_response
+from api.responses import PydanticJSONResponse
+from db.models import Task
+from config import get_settings
+from db.session import get_session, get_read_session
+from events import Broker, BrokerUnavailableError, TaskEvent, TaskEventType, get_broker
 
-from .config import API_PREFIX
-from .schemas import Task as TaskSchema, TasksList, AddNewTask, UpdateTask
-from ..auth.utils import get_current_user
+from .config import (
+    API_PREFIX,
+    IDEMPOTENCY_KEY_MAX_LENGTH,
+    DEFAULT_STATS_WINDOW_HOURS,
+    MAX_STATS_WINDOW_HOURS,
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    MAX_SEARCH_QUERY_LENGTH,
+)
+from .schemas import (
+    Task as TaskSchema,
+    TasksPage,
+    AddNewTask,
+    UpdateTask,
+    TaskFilters,
+    PageParams,
+    FileFormat,
+    BatchAddTasks,
+    BatchUpdateTasks,
+    BatchDeleteTasks,
+    BatchItemResult,
+    BatchItemStatus,
+    BatchResult,
+    ImportResult,
+    TaskStats,
+    TaskChanges,
+)
+from .utils import (
+    TASK_COLUMNS,
+    get_unique_ids,
+    get_task_filters,
+    get_page_params,
+    apply_task_filters,
+    apply_keyset_pagination,
+    make_tasks_page,
+    stream_tasks,
+    import_tasks_from_stream,
+    bump_tasks_version,
+    add_task_tombstones,
+    get_task_changes,
+    stream_task_events,
+    update_tasks,
+    get_task_stats,
+    search_tasks,
+    get_task_etag,
+    check_task_if_match,
+    get_tasks_version,
+    get_tasks_list_etag,
+)
+from ..auth.schemas import Principal
+from ..auth.utils import get_current_principal
 
 router = APIRouter(prefix=API_PREFIX, tags=["Tasks"])
 
 
 @router.get(
-    "/{task_id}",
+    "/{task_id:int}",
     status_code=status.HTTP_200_OK,
     response_model=TaskSchema,
     responses={
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "Task is not changed since ETag or time of If-None-Match / If-Modified-Since",
+        },
         status.HTTP_401_UNAUTHORIZED: {
             "description": "Could not validate credentials",
         },
@@ -29,45 +86,267 @@ router = APIRouter(prefix=API_PREFIX, tags=["Tasks"])
 )
 async def get_task(
         task_id: int,
-        user: Annotated[User, Depends(get_current_user)],
-        session: Annotated[AsyncSession, Depends(get_session)]
+        request: Request,
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_read_session)]
 ):
-    stmt = select(Task).where(Task.id == task_id, Task.user_id == user.id).limit(1)
+    # select plain rows, no ORM objects are needed to read
+    stmt = select(*TASK_COLUMNS).where(Task.id == task_id, Task.user_id == user.id).limit(1)
     result = await session.execute(stmt)
-    task = result.scalar_one_or_none()
+    task = result.mappings().one_or_none()
     if task is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cannot find the task",
         )
 
-    task_response = TaskSchema.model_validate(task, from_attributes=True)
-    return task_response
+    etag = get_task_etag(task["id"], task["updated_at"])
+    if is_not_modified(request.headers, etag, task["updated_at"]):
+        # client's copy is valid, the task isn't serialized
+        return not_modified_response(etag, task["updated_at"])
+
+    task_response = TaskSchema.model_validate(task)
+    return PydanticJSONResponse(task_response, headers=get_validator_headers(etag, task["updated_at"]))
 
 
 @router.get(
     "/",
     status_code=status.HTTP_200_OK,
-    response_model=TasksList,
+    response_model=TasksPage,
     responses={
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "User's tasks are not changed since ETag or time of If-None-Match / If-Modified-Since",
+        },
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Invalid cursor",
+        },
         status.HTTP_401_UNAUTHORIZED: {
             "description": "Could not validate credentials",
         },
     }
 )
 async def get_all_tasks(
-        user: Annotated[User, Depends(get_current_user)],
-        session: Annotated[AsyncSession, Depends(get_session)]
+        request: Request,
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_read_session)],
+        filters: Annotated[TaskFilters, Depends(get_task_filters)],
+        page: Annotated[PageParams, Depends(get_page_params)],
+):
+    # version is read before tasks, so a concurrent change makes ETag stale, not the page
+    version, updated_at = await get_tasks_version(session, user.id)
+    etag = get_tasks_list_etag(user.id, version, request.url.query)
+    if is_not_modified(request.headers, etag, updated_at):
+        return not_modified_response(etag, updated_at)
+
+    stmt = select(*TASK_COLUMNS).where(Task.user_id == user.id)
+    stmt = apply_task_filters(stmt, filters)
+    stmt = apply_keyset_pagination(stmt, page)
+    result = await session.execute(stmt)
+    return PydanticJSONResponse(
+        make_tasks_page(result.mappings().all(), page),
+        headers=get_validator_headers(etag, updated_at),
+    )
+
+
+@router.get(
+    "/search",
+    status_code=status.HTTP_200_OK,
+    response_model=TasksPage,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Invalid cursor",
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Could not validate credentials",
+        },
+    }
+)
+async def search_user_tasks(
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_read_session)],
+        q: Annotated[str, Query(min_length=1, max_length=MAX_SEARCH_QUERY_LENGTH)],
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+):
+    """
+    Find tasks by words of title and description, the most relevant first.
+    Pass `next_cursor` from the response as `cursor` with the same `q` to get the next page.
+    """
+    tasks_page = await search_tasks(session, user.id, q, limit, cursor)
+    return PydanticJSONResponse(tasks_page)
+
+
+@router.get(
+    "/changes",
+    status_code=status.HTTP_200_OK,
+    response_model=TaskChanges,
+    responses={
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Invalid sync token",
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Could not validate credentials",
+        },
+        status.HTTP_410_GONE: {
+            "description": "Sync token is expired, get all tasks again",
+        },
+    }
+)
+async def get_tasks_changes(
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_read_session)],
+        since: str | None = None,
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+):
+    """
+    Get tasks created, updated or deleted since `since` sync token (delta sync).
+    Without `since` all tasks are returned.
+    Pass `sync_token` from the response as `since` next time,
+    right away if `has_more` is true.
+    """
+    task_changes = await get_task_changes(session, user.id, since, limit)
+    return PydanticJSONResponse(task_changes)
+
+
+@router.get(
+    "/stream",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {"text/event-stream": {}},
+            "description": "Server-sent events of changes of user's tasks",
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Could not validate credentials",
+        },
+        status.HTTP_503_SERVICE_UNAVAILABLE: {
+            "description": "Task events are not available",
+        },
+    }
+)
+async def stream_tasks_events(
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+        broker: Annotated[Broker, Depends(get_broker)],
+):
+    """
+    Stream changes of user's tasks made by any client as server-sent events
+    (`created`, `updated`, `deleted` with task ids and version of user's tasks as event id).
+    On `reset` event or after reconnect get missed changes from GET /tasks/changes.
+    """
+    # the stream may be open for hours, it mustn't hold a database connection
+    await session.close()
+    try:
+        subscription = await broker.subscribe(user.id)
+    except BrokerUnavailableError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Task events are not available",
+        )
+    return StreamingResponse(
+        stream_task_events(broker, subscription, get_settings().TASK_EVENTS_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        # disable buffering of proxies
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get(
+    "/export",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+            "description": "All user's tasks, one per line",
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Could not validate credentials",
+        },
+    }
+)
+async def export_tasks(
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_read_session)],
+        filters: Annotated[TaskFilters, Depends(get_task_filters)],
+        export_format: Annotated[FileFormat, Query(alias="format")] = FileFormat.ndjson,
 ):
-    await session.refresh(user, attribute_names=["tasks"])
-    tasks = user.tasks
-    tasks_list_schema = TasksList.model_validate(tasks)
-    return tasks_list_schema
+    stmt = select(*TASK_COLUMNS).where(Task.user_id == user.id).order_by(Task.id)
+    stmt = apply_task_filters(stmt, filters)
+
+    media_type = "text/csv" if export_format == FileFormat.csv else "application/x-ndjson"
+    return StreamingResponse(
+        stream_tasks(session, stmt, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tasks.{export_format.value}"'},
+    )
+
+
+@router.get(
+    "/stats",
+    status_code=status.HTTP_200_OK,
+    response_model=TaskStats,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Could not validate credentials",
+        },
+    }
+)
+async def get_tasks_stats(
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_read_session)],
+        window_hours: Annotated[int, Query(ge=1, le=MAX_STATS_WINDOW_HOURS)] = DEFAULT_STATS_WINDOW_HOURS,
+):
+    """
+    Get number of all, done and open tasks from counters
+    and number of tasks created in the last `window_hours` hours.
+    """
+    task_stats = await get_task_stats(session, user.id, window_hours)
+    return PydanticJSONResponse(task_stats)
 
 
 @router.post(
-    "/",
+    "/import",
     status_code=status.HTTP_200_OK,
+    response_model=ImportResult,
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/x-ndjson": {}, "text/csv": {}},
+            "required": True,
+        },
+    },
+    responses={
+        status.HTTP_400_BAD_REQUEST: {
+            "description": "Invalid CSV header",
+        },
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Could not validate credentials",
+        },
+    }
+)
+async def import_tasks(
+        request: Request,
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+        broker: Annotated[Broker, Depends(get_broker)],
+        import_format: Annotated[FileFormat, Query(alias="format")] = FileFormat.ndjson,
+):
+    """
+    Add tasks from NDJSON or CSV body, every line (record) is validated as AddNewTask.
+    CSV must have header with title and optionally description, is_done columns.
+    Body is read as a stream, invalid lines are skipped and reported.
+    """
+    import_result = await import_tasks_from_stream(
+        session, user.id, request.stream(), import_format, broker
+    )
+    return PydanticJSONResponse(import_result)
+
+
+@router.post(
+    "/",
+    status_code=status.HTTP_201_CREATED,
+    response_model=TaskSchema,
     responses={
         status.HTTP_401_UNAUTHORIZED: {
             "description": "Could not validate credentials",
@@ -76,18 +355,58 @@ async def get_all_tasks(
 )
 async def add_new_task(
         task_schema: AddNewTask,
-        user: Annotated[User, Depends(get_current_user)],
-        session: Annotated[AsyncSession, Depends(get_session)]
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+        broker: Annotated[Broker, Depends(get_broker)],
+        request: Request,
+        idempotency_key: Annotated[str | None, Header(max_length=IDEMPOTENCY_KEY_MAX_LENGTH)] = None,
 ):
-    task = Task(**task_schema.model_dump())
-    task.user_id = user.id
-    session.add(task)
-    await session.commit()
+    """
+    Create task and return it.
+    Retried request with the same Idempotency-Key header returns the task created first time.
+    """
+    try:
+        version = await bump_tasks_version(session, user.id, total=1, done=int(task_schema.is_done))
+        stmt = (
+            insert(Task)
+            .values(
+                **task_schema.model_dump(),
+                user_id=user.id,
+                idempotency_key=idempotency_key,
+                sync_version=version,
+            )
+            .returning(*TASK_COLUMNS)
+        )
+        result = await session.execute(stmt)
+        task = result.mappings().one()
+        await broker.publish(session, TaskEvent(TaskEventType.created, user.id, version, [task["id"]]))
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        if idempotency_key is None:
+            raise
+        stmt = (
+            select(*TASK_COLUMNS)
+            .where(Task.user_id == user.id, Task.idempotency_key == idempotency_key)
+            .limit(1)
+        )
+        result = await session.execute(stmt)
+        task = result.mappings().one_or_none()
+        if task is None:
+            # violation of another constraint, not a retried request
+            raise
+
+    return PydanticJSONResponse(
+        TaskSchema.model_validate(task),
+        status_code=status.HTTP_201_CREATED,
+        headers={"Location": str(request.url_for("get_task", task_id=task["id"]))},
+    )
 
 
 @router.put(
-    "/{task_id}",
+    "/{task_id:int}",
     status_code=status.HTTP_200_OK,
+    response_model=TaskSchema,
     responses={
         status.HTTP_401_UNAUTHORIZED: {
             "description": "Could not validate credentials",
@@ -95,34 +414,44 @@ async def add_new_task(
         status.HTTP_404_NOT_FOUND: {
             "description": "Cannot find the task",
         },
+        status.HTTP_412_PRECONDITION_FAILED: {
+            "description": "Task was changed, ETag doesn't match If-Match",
+        },
     }
 )
 async def update_task(
         task_id: int,
         task_schema: UpdateTask,
-        user: Annotated[User, Depends(get_current_user)],
-        session: Annotated[AsyncSession, Depends(get_session)]
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+        broker: Annotated[Broker, Depends(get_broker)],
+        if_match: Annotated[str | None, Header()] = None,
 ):
-    stmt = select(Task).where(Task.id == task_id, Task.user_id == user.id).limit(1)
-    result = await session.execute(stmt)
-    task = result.scalar_one_or_none()
-
-    if task is None:
+    """
+    Update given fields of the task.
+    Pass ETag of the task as If-Match header to not overwrite concurrent changes.
+    """
+    if if_match is not None:
+        await check_task_if_match(session, user.id, task_id, if_match)
+    changes = task_schema.model_dump(exclude_unset=True)
+    rows, version = await update_tasks(session, user.id, [task_id], changes)
+    if not rows:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cannot find the task",
         )
-
-    data_to_update = task_schema.model_dump(exclude_unset=True)
-    for attr, value in data_to_update.items():
-        setattr(task, attr, value)
-
-    session.add(task)
+    task = rows[0]
+    await broker.publish(session, TaskEvent(TaskEventType.updated, user.id, version, [task_id]))
     await session.commit()
 
+    return PydanticJSONResponse(
+        TaskSchema.model_validate(task),
+        headers=get_validator_headers(get_task_etag(task["id"], task["updated_at"]), task["updated_at"]),
+    )
+
 
 @router.delete(
-    "/{task_id}",
+    "/{task_id:int}",
     status_code=status.HTTP_200_OK,
     responses={
         status.HTTP_401_UNAUTHORIZED: {
@@ -131,21 +460,190 @@ async def update_task(
         status.HTTP_404_NOT_FOUND: {
             "description": "Cannot find the task",
         },
+        status.HTTP_412_PRECONDITION_FAILED: {
+            "description": "Task was changed, ETag doesn't match If-Match",
+        },
     }
 )
 async def delete_task(
         task_id: int,
-        user: Annotated[User, Depends(get_current_user)],
+        user: Annotated[Principal, Depends(get_current_principal)],
         session: Annotated[AsyncSession, Depends(get_session)],
+        broker: Annotated[Broker, Depends(get_broker)],
+        if_match: Annotated[str | None, Header()] = None,
 ):
-    stmt = select(Task).where(Task.id == task_id, Task.user_id == user.id).limit(1)
+    """
+    Delete the task.
+    Pass ETag of the task as If-Match header to not delete concurrently changed task.
+    """
+    if if_match is not None:
+        await check_task_if_match(session, user.id, task_id, if_match)
+    stmt = (
+        delete(Task)
+        .where(Task.id == task_id, Task.user_id == user.id)
+        .returning(Task.is_done)
+        .execution_options(synchronize_session=False)
+    )
     result = await session.execute(stmt)
-    task = result.scalar_one_or_none()
-    if task is None:
+    is_done = result.scalar_one_or_none()
+    if is_done is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Cannot find the task",
         )
+    version = await bump_tasks_version(session, user.id, total=-1, done=-int(is_done))
+    await add_task_tombstones(session, user.id, [task_id], version)
+    await broker.publish(session, TaskEvent(TaskEventType.deleted, user.id, version, [task_id]))
+    await session.commit()
+
 
-    await session.delete(task)
+@router.post(
+    "/batch",
+    status_code=status.HTTP_200_OK,
+    response_model=BatchResult,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Could not validate credentials",
+        },
+    }
+)
+async def add_tasks_batch(
+        batch: BatchAddTasks,
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+        broker: Annotated[Broker, Depends(get_broker)],
+):
+    version = await bump_tasks_version(
+        session,
+        user.id,
+        total=len(batch.items),
+        done=sum(task_schema.is_done for task_schema in batch.items),
+    )
+    rows = [
+        {**task_schema.model_dump(), "user_id": user.id, "sync_version": version}
+        for task_schema in batch.items
+    ]
+    stmt = insert(Task).returning(*TASK_COLUMNS, sort_by_parameter_order=True)
+    result = await session.execute(stmt, rows)
+    created_tasks = result.mappings().all()
+    await broker.publish(
+        session,
+        TaskEvent(TaskEventType.created, user.id, version, [task["id"] for task in created_tasks]),
+    )
     await session.commit()
+
+    return PydanticJSONResponse(BatchResult(items=[
+        BatchItemResult(
+            id=task["id"],
+            status=BatchItemStatus.created,
+            task=TaskSchema.model_validate(task),
+        )
+        for task in created_tasks
+    ]))
+
+
+@router.put(
+    "/batch",
+    status_code=status.HTTP_200_OK,
+    response_model=BatchResult,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Could not validate credentials",
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Cannot find some of the tasks in atomic mode",
+        },
+    }
+)
+async def update_tasks_batch(
+        batch: BatchUpdateTasks,
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+        broker: Annotated[Broker, Depends(get_broker)],
+):
+    ids = get_unique_ids(batch.ids)
+    changes = batch.changes.model_dump(exclude_unset=True)
+    rows, version = await update_tasks(session, user.id, ids, changes)
+    updated_tasks = {task["id"]: task for task in rows}
+
+    missing_ids = [task_id for task_id in ids if task_id not in updated_tasks]
+    if missing_ids and batch.atomic:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Cannot find tasks with ids: {', '.join(map(str, missing_ids))}",
+        )
+    if updated_tasks:
+        await broker.publish(session, TaskEvent(TaskEventType.updated, user.id, version, list(updated_tasks)))
+        await session.commit()
+
+    return PydanticJSONResponse(BatchResult(items=[
+        BatchItemResult(
+            id=task_id,
+            status=BatchItemStatus.updated,
+            task=TaskSchema.model_validate(updated_tasks[task_id]),
+        )
+        if task_id in updated_tasks else
+        BatchItemResult(id=task_id, status=BatchItemStatus.not_found)
+        for task_id in ids
+    ]))
+
+
+@router.delete(
+    "/batch",
+    status_code=status.HTTP_200_OK,
+    response_model=BatchResult,
+    responses={
+        status.HTTP_401_UNAUTHORIZED: {
+            "description": "Could not validate credentials",
+        },
+        status.HTTP_404_NOT_FOUND: {
+            "description": "Cannot find some of the tasks in atomic mode",
+        },
+    }
+)
+async def delete_tasks_batch(
+        batch: BatchDeleteTasks,
+        user: Annotated[Principal, Depends(get_current_principal)],
+        session: Annotated[AsyncSession, Depends(get_session)],
+        broker: Annotated[Broker, Depends(get_broker)],
+):
+    ids = get_unique_ids(batch.ids)
+    stmt = (
+        delete(Task)
+        .where(Task.user_id == user.id, Task.id.in_(ids))
+        .returning(Task.id, Task.is_done)
+        .execution_options(synchronize_session=False)
+    )
+    result = await session.execute(stmt)
+    deleted_tasks = result.all()
+    deleted_ids = {task.id for task in deleted_tasks}
+
+    missing_ids = [task_id for task_id in ids if task_id not in deleted_ids]
+    if missing_ids and batch.atomic:
+        await session.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Cannot find tasks with ids: {', '.join(map(str, missing_ids))}",
+        )
+    if deleted_tasks:
+        version = await bump_tasks_version(
+            session,
+            user.id,
+            total=-len(deleted_tasks),
+            done=-sum(task.is_done for task in deleted_tasks),
+        )
+        await add_task_tombstones(session, user.id, list(deleted_ids), version)
+        await broker.publish(
+            session,
+            TaskEvent(TaskEventType.deleted, user.id, version, [task.id for task in deleted_tasks]),
+        )
+        await session.commit()
+
+    return PydanticJSONResponse(BatchResult(items=[
+        BatchItemResult(
+            id=task_id,
+            status=BatchItemStatus.deleted if task_id in deleted_ids else BatchItemStatus.not_found,
+        )
+        for task_id in ids
+    ]))
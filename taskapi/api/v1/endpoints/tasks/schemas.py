@@ -1,6 +1,9 @@
 import datetime as dt
+from enum import Enum
 
-from pydantic import BaseModel, ConfigDict, constr, model_validator, RootModel
+from pydantic import BaseModel, ConfigDict, conlist, constr, model_validator, RootModel
+
+from .config import MAX_BATCH_SIZE
 
 
 class Task(BaseModel):
@@ -36,3 +39,110 @@ class UpdateTask(BaseModel):
 
 class TasksList(RootModel):
     root: list[Task]
+
+
+class TasksPage(BaseModel):
+    items: list[Task]
+    # pass it as `cursor` query parameter to get the next page,
+    # None means there are no more tasks
+    next_cursor: str | None = None
+
+
+class TaskOrderBy(str, Enum):
+    id = "id"
+    created_at = "created_at"
+
+
+class SortOrder(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+
+class FileFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+class TaskFilters(BaseModel):
+    is_done: bool | None = None
+    created_after: dt.datetime | None = None
+    created_before: dt.datetime | None = None
+    updated_after: dt.datetime | None = None
+    updated_before: dt.datetime | None = None
+
+
+class PageParams(BaseModel):
+    limit: int
+    cursor: str | None = None
+    order_by: TaskOrderBy = TaskOrderBy.id
+    order: SortOrder = SortOrder.asc
+
+
+class BatchAddTasks(BaseModel):
+    items: conlist(AddNewTask, min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class BatchUpdateTasks(BaseModel):
+    # the same changes are applied to every task
+    ids: conlist(int, min_length=1, max_length=MAX_BATCH_SIZE)
+    changes: UpdateTask
+    # if True, nothing is updated when some of the tasks are not found
+    atomic: bool = False
+
+
+class BatchDeleteTasks(BaseModel):
+    ids: conlist(int, min_length=1, max_length=MAX_BATCH_SIZE)
+    # if True, nothing is deleted when some of the tasks are not found
+    atomic: bool = False
+
+
+class BatchItemStatus(str, Enum):
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+    not_found = "not_found"
+
+
+class BatchItemResult(BaseModel):
+    id: int | None = None
+    status: BatchItemStatus
+    task: Task | None = None
+
+
+class BatchResult(BaseModel):
+    items: list[BatchItemResult]
+
+
+class ImportLineError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    imported: int
+    failed: int
+    # first MAX_IMPORT_ERRORS errors
+    errors: list[ImportLineError]
+    elapsed_seconds: float
+    rows_per_second: float
+
+
+class TaskStats(BaseModel):
+    total: int
+    done: int
+    open: int
+    # number of tasks created in the last window_hours hours,
+    # counted by (user_id, created_at) index, not read from counters
+    created_in_window: int
+    window_hours: int
+
+
+class TaskChanges(BaseModel):
+    # tasks created or updated since the sync token
+    updated: list[Task]
+    # ids of tasks deleted since the sync token
+    deleted: list[int]
+    # pass it as `since` query parameter to get the next changes
+    sync_token: str
+    # True if not all changes fit into the response, request the next ones right away
+    has_more: bool
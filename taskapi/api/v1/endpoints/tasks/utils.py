@@ -0,0 +1,872 @@
+import asyncio
+import base64
+import codecs
+import csv
+import datetime as dt
+import hashlib
+import io
+import json
+import random
+import time
+from typing import Annotated, AsyncIterator, Sequence
+
+from fastapi import HTTPException, Query, status
+from pydantic import ValidationError
+from pydantic_core import to_json
+from sqlalchemy import (
+    ColumnElement,
+    Integer,
+    RowMapping,
+    Select,
+    and_,
+    case,
+    cast,
+    delete,
+    false,
+    func,
+    insert,
+    literal,
+    literal_column,
+    null,
+    or_,
+    select,
+    true,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.conditional import parse_etags
+from db.models import Task, TaskCounter, TaskTombstone
+from events import Broker, Subscription, TaskEvent, TaskEventType
+
+from .config import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    EXPORT_CHUNK_SIZE,
+    IMPORT_BATCH_SIZE,
+    MAX_IMPORT_ERRORS,
+    MAX_CSV_RECORD_LINES,
+    MAX_CSV_RECORD_LENGTH,
+    SEARCH_TEXT_CONFIG,
+    SYNC_TOKEN_MAX_AGE_DAYS,
+    TOMBSTONE_RETENTION_DAYS,
+    TOMBSTONE_CLEANUP_RATE,
+)
+from .schemas import (
+    TasksPage,
+    TaskFilters,
+    TaskOrderBy,
+    SortOrder,
+    PageParams,
+    FileFormat,
+    AddNewTask,
+    ImportLineError,
+    ImportResult,
+    TaskStats,
+    TaskChanges,
+)
+
+# columns of tasks table returned by the API
+TASK_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.is_done,
+    Task.created_at,
+    Task.updated_at,
+)
+# timestamps in the database are naive UTC
+EPOCH = dt.datetime(1970, 1, 1)
+
+INVALID_CURSOR = "Invalid cursor"
+INVALID_SYNC_TOKEN = "Invalid sync token"
+
+
+def get_task_filters(
+        is_done: bool | None = None,
+        created_after: dt.datetime | None = None,
+        created_before: dt.datetime | None = None,
+        updated_after: dt.datetime | None = None,
+        updated_before: dt.datetime | None = None,
+) -> TaskFilters:
+    """ Dependency to collect task filters from query parameters """
+    return TaskFilters(
+        is_done=is_done,
+        created_after=created_after,
+        created_before=created_before,
+        updated_after=updated_after,
+        updated_before=updated_before,
+    )
+
+
+def get_page_params(
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        order_by: TaskOrderBy = TaskOrderBy.id,
+        order: SortOrder = SortOrder.asc,
+) -> PageParams:
+    """ Dependency to collect keyset pagination params from query parameters """
+    return PageParams(
+        limit=limit,
+        cursor=cursor,
+        order_by=order_by,
+        order=order,
+    )
+
+
+def apply_task_filters(stmt: Select, filters: TaskFilters) -> Select:
+    """ Add WHERE clauses for every defined filter """
+    if filters.is_done is not None:
+        stmt = stmt.where(Task.is_done == filters.is_done)
+    if filters.created_after is not None:
+        stmt = stmt.where(Task.created_at >= filters.created_after)
+    if filters.created_before is not None:
+        stmt = stmt.where(Task.created_at < filters.created_before)
+    if filters.updated_after is not None:
+        stmt = stmt.where(Task.updated_at >= filters.updated_after)
+    if filters.updated_before is not None:
+        stmt = stmt.where(Task.updated_at < filters.updated_before)
+    return stmt
+
+
+def _get_sort_columns(order_by: TaskOrderBy) -> tuple:
+    # Task.id is always the last column to make the order unique
+    if order_by == TaskOrderBy.created_at:
+        return Task.created_at, Task.id
+    return (Task.id,)
+
+
+def _get_sort_key(task: RowMapping, order_by: TaskOrderBy) -> list:
+    return [task[column.key] for column in _get_sort_columns(order_by)]
+
+
+def _get_invalid_cursor_exception(detail: str = INVALID_CURSOR) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=detail,
+    )
+
+
+def _encode_cursor_data(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor_data(cursor: str, detail: str = INVALID_CURSOR) -> dict:
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError):
+        raise _get_invalid_cursor_exception(detail)
+    if not isinstance(data, dict):
+        raise _get_invalid_cursor_exception(detail)
+    return data
+
+
+def encode_cursor(page: PageParams, key: list) -> str:
+    """
+    Make opaque cursor pointing right after the task with sort key `key`
+    """
+    return _encode_cursor_data({
+        "o": page.order_by.value,
+        "d": page.order.value,
+        "k": [value.isoformat() if isinstance(value, dt.datetime) else value for value in key],
+    })
+
+
+def decode_cursor(page: PageParams) -> list:
+    """
+    Get sort key from the cursor.
+    Cursor must be made with the same ordering as in `page`.
+    """
+    invalid_cursor_exception = _get_invalid_cursor_exception()
+    data = _decode_cursor_data(page.cursor)
+    try:
+        order_by, order, key = data["o"], data["d"], data["k"]
+    except KeyError:
+        raise invalid_cursor_exception
+
+    if order_by != page.order_by.value or order != page.order.value:
+        raise invalid_cursor_exception
+
+    columns = _get_sort_columns(page.order_by)
+    if not isinstance(key, list) or len(key) != len(columns):
+        raise invalid_cursor_exception
+    try:
+        if page.order_by == TaskOrderBy.created_at:
+            key[0] = dt.datetime.fromisoformat(key[0])
+        key[-1] = int(key[-1])
+    except (ValueError, TypeError):
+        raise invalid_cursor_exception
+    return key
+
+
+def apply_keyset_pagination(stmt: Select, page: PageParams) -> Select:
+    """
+    Order statement by page's sorting and select tasks after page's cursor.
+    One extra row is selected to find out if the next page exists.
+    """
+    columns = _get_sort_columns(page.order_by)
+    is_desc = page.order == SortOrder.desc
+
+    if page.cursor is not None:
+        key = decode_cursor(page)
+        if is_desc:
+            stmt = stmt.where(tuple_(*columns) < tuple_(*key))
+        else:
+            stmt = stmt.where(tuple_(*columns) > tuple_(*key))
+
+    order_by_clauses = [column.desc() if is_desc else column.asc() for column in columns]
+    return stmt.order_by(*order_by_clauses).limit(page.limit + 1)
+
+
+def make_tasks_page(tasks: Sequence[RowMapping], page: PageParams) -> TasksPage:
+    """
+    Make page from rows of TASK_COLUMNS selected with `apply_keyset_pagination`.
+    Rows are validated by pydantic-core as a whole list, without ORM objects.
+    """
+    next_cursor = None
+    if len(tasks) > page.limit:
+        tasks = tasks[:page.limit]
+        next_cursor = encode_cursor(page, _get_sort_key(tasks[-1], page.order_by))
+
+    return TasksPage(
+        items=tasks,
+        next_cursor=next_cursor,
+    )
+
+
+def _get_search_query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_search_cursor(query: str, rank: float, task_id: int) -> str:
+    """ Make opaque cursor pointing right after the found task, valid only for the same query """
+    return _encode_cursor_data({"q": _get_search_query_hash(query), "k": [rank, task_id]})
+
+
+def decode_search_cursor(query: str, cursor: str) -> tuple[float, int]:
+    """ Get (rank, id) of the last task of previous page """
+    data = _decode_cursor_data(cursor)
+    try:
+        query_hash = data["q"]
+        rank, task_id = data["k"]
+        rank, task_id = float(rank), int(task_id)
+    except (KeyError, ValueError, TypeError):
+        raise _get_invalid_cursor_exception()
+    if query_hash != _get_search_query_hash(query):
+        raise _get_invalid_cursor_exception()
+    return rank, task_id
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _get_search_clauses(dialect_name: str, query: str) -> tuple[ColumnElement, ColumnElement]:
+    """
+    Get (rank, condition) of tasks matching the query.
+    PostgreSQL uses tasks.search_vector generated column, it isn't declared in the model,
+    because it exists only in PostgreSQL. Query supports web search syntax: "quoted phrase", or, -word.
+    Other databases fall back to LIKE: every word must be found in title or description,
+    rank is the number of words found in title.
+    """
+    if dialect_name == "postgresql":
+        ts_query = func.websearch_to_tsquery(SEARCH_TEXT_CONFIG, query)
+        search_vector = literal_column(f"{Task.__tablename__}.search_vector", type_=postgresql.TSVECTOR)
+        return func.ts_rank_cd(search_vector, ts_query), search_vector.bool_op("@@")(ts_query)
+
+    conditions = []
+    title_matches = []
+    for word in query.split():
+        pattern = f"%{_escape_like(word)}%"
+        title_match = Task.title.ilike(pattern, escape="\\")
+        conditions.append(or_(title_match, Task.description.ilike(pattern, escape="\\")))
+        title_matches.append(case((title_match, 1.0), else_=0.0))
+    return sum(title_matches[1:], title_matches[0]), and_(*conditions)
+
+
+async def search_tasks(
+        session: AsyncSession,
+        user_id: int,
+        query: str,
+        limit: int,
+        cursor: str | None = None,
+) -> TasksPage:
+    """
+    Find user's tasks by words of title and description,
+    the most relevant tasks are the first, pages are selected by (rank, id) cursor.
+    """
+    if not query.split():
+        return TasksPage(items=[])
+
+    connection = await session.connection()
+    rank, condition = _get_search_clauses(connection.dialect.name, query)
+    stmt = select(*TASK_COLUMNS, rank.label("rank")).where(Task.user_id == user_id, condition)
+    if cursor is not None:
+        stmt = stmt.where(tuple_(rank, Task.id) < tuple_(*decode_search_cursor(query, cursor)))
+    stmt = stmt.order_by(rank.desc(), Task.id.desc()).limit(limit + 1)
+    tasks = (await session.execute(stmt)).mappings().all()
+
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_search_cursor(query, tasks[-1]["rank"], tasks[-1]["id"])
+    return TasksPage(items=tasks, next_cursor=next_cursor)
+
+
+def get_unique_ids(ids: list[int]) -> list[int]:
+    """ Remove duplicated ids keeping their order """
+    return list(dict.fromkeys(ids))
+
+
+def _get_tasks_version_upsert(dialect_name: str, values: dict | Select):
+    """
+    Statement increasing version of user's tasks, adding deltas to its counters and returning the version.
+    `values` are user_id, total and done deltas, or select of them, it's a new counter row
+    if user has none yet, otherwise its deltas are added to the counters.
+    """
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    if isinstance(values, dict):
+        stmt = dialect_insert(TaskCounter).values(**values, version=1, updated_at=func.now())
+    else:
+        stmt = dialect_insert(TaskCounter).from_select(["user_id", "total", "done", "version", "updated_at"], values)
+    return stmt.on_conflict_do_update(
+        index_elements=[TaskCounter.user_id],
+        set_={
+            "version": TaskCounter.version + 1,
+            "total": TaskCounter.total + stmt.excluded.total,
+            "done": TaskCounter.done + stmt.excluded.done,
+            "updated_at": func.now(),
+        },
+    ).returning(TaskCounter.version)
+
+
+async def bump_tasks_version(session: AsyncSession, user_id: int, total: int = 0, done: int = 0) -> int:
+    """
+    Increase version of user's tasks, add deltas to its counters and return the version,
+    changed tasks and tombstones are stamped with it.
+    Counter row is locked until the end of transaction, so concurrent changes
+    of the same user's tasks are serialized and versions are committed in increasing order.
+    Existing tasks which are changed must be locked before (by the write or a locking read),
+    so all transactions lock tasks before the counter row and don't deadlock.
+    """
+    connection = await session.connection()
+    stmt = _get_tasks_version_upsert(
+        connection.dialect.name,
+        {"user_id": user_id, "total": total, "done": done},
+    )
+    return (await session.execute(stmt)).scalar_one()
+
+
+async def add_task_tombstones(session: AsyncSession, user_id: int, task_ids: list[int], version: int) -> None:
+    """
+    Remember deleted tasks for delta sync.
+    User's tombstones older than TOMBSTONE_RETENTION_DAYS are removed by TOMBSTONE_CLEANUP_RATE
+    share of calls, the delete scans user's tombstones by primary key.
+    """
+    now = dt.datetime.utcnow()
+    await session.execute(insert(TaskTombstone), [
+        {"user_id": user_id, "version": version, "task_id": task_id, "deleted_at": now}
+        for task_id in task_ids
+    ])
+    if random.random() >= TOMBSTONE_CLEANUP_RATE:
+        return
+    stmt = delete(TaskTombstone).where(
+        TaskTombstone.user_id == user_id,
+        TaskTombstone.deleted_at < now - dt.timedelta(days=TOMBSTONE_RETENTION_DAYS),
+    )
+    await session.execute(stmt)
+
+
+def encode_sync_token(version: int, task_id: int, issued_at: float) -> str:
+    """
+    Make opaque sync token pointing right after the change (version, task_id).
+    issued_at is the time (unix timestamp) the client's copy is actual for.
+    """
+    return _encode_cursor_data({"v": version, "i": task_id, "t": issued_at})
+
+
+def decode_sync_token(token: str) -> tuple[int, int, float]:
+    """ Get (version, task id, issued_at) from the sync token """
+    data = _decode_cursor_data(token, detail=INVALID_SYNC_TOKEN)
+    try:
+        version, task_id, issued_at = int(data["v"]), int(data["i"]), float(data["t"])
+    except (KeyError, ValueError, TypeError):
+        raise _get_invalid_cursor_exception(INVALID_SYNC_TOKEN)
+    return version, task_id, issued_at
+
+
+async def get_task_changes(session: AsyncSession, user_id: int, since: str | None, limit: int) -> TaskChanges:
+    """
+    Get tasks created, updated or deleted after the sync token, the oldest changes first.
+    Only changed tasks and tombstones are read by (user_id, version, id) indexes,
+    so the cost depends on number of changes, not on number of tasks.
+    Without token all tasks are returned (initial sync).
+    """
+    now = time.time()
+    if since is None:
+        version, task_id, issued_at = 0, 0, now
+    else:
+        version, task_id, issued_at = decode_sync_token(since)
+        if now - issued_at > SYNC_TOKEN_MAX_AGE_DAYS * 24 * 60 * 60:
+            # tombstones of deletes after the token may be removed already
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync token is expired, get all tasks again",
+            )
+
+    tasks_stmt = select(
+        Task.sync_version.label("version"),
+        *TASK_COLUMNS,
+        false().label("deleted"),
+    ).where(
+        Task.user_id == user_id,
+        tuple_(Task.sync_version, Task.id) > tuple_(version, task_id),
+    )
+    if since is not None:
+        # there is nothing to delete on the client during initial sync
+        tombstones_stmt = select(
+            TaskTombstone.version,
+            TaskTombstone.task_id.label("id"),
+            *(null().label(column.key) for column in TASK_COLUMNS[1:]),
+            true().label("deleted"),
+        ).where(
+            TaskTombstone.user_id == user_id,
+            tuple_(TaskTombstone.version, TaskTombstone.task_id) > tuple_(version, task_id),
+        )
+        changes = union_all(tasks_stmt, tombstones_stmt).subquery()
+    else:
+        changes = tasks_stmt.subquery()
+    stmt = select(changes).order_by(changes.c.version, changes.c.id).limit(limit + 1)
+    rows = (await session.execute(stmt)).mappings().all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        version, task_id = rows[-1]["version"], rows[-1]["id"]
+    if not has_more:
+        # client has all changes made before this request
+        issued_at = now
+    return TaskChanges(
+        updated=[row for row in rows if not row["deleted"]],
+        deleted=[row["id"] for row in rows if row["deleted"]],
+        sync_token=encode_sync_token(version, task_id, issued_at),
+        has_more=has_more,
+    )
+
+
+def _get_timestamp_micros(value: dt.datetime) -> int:
+    return (value - EPOCH) // dt.timedelta(microseconds=1)
+
+
+def get_task_etag(task_id: int, updated_at: dt.datetime | None) -> str:
+    """
+    Strong ETag of a task, it is changed by every update of the task.
+    Made of id and updated_at, so it is checked without serializing the task.
+    """
+    micros = _get_timestamp_micros(updated_at) if updated_at is not None else 0
+    return f'"{task_id}-{micros:x}"'
+
+
+async def check_task_if_match(session: AsyncSession, user_id: int, task_id: int, if_match: str) -> None:
+    """
+    Check If-Match header against actual ETag of the task (optimistic concurrency).
+    Task is locked until the end of transaction, so it isn't changed between the check and the write.
+    """
+    stmt = (
+        select(Task.updated_at)
+        .where(Task.id == task_id, Task.user_id == user_id)
+        .with_for_update()
+    )
+    row = (await session.execute(stmt)).one_or_none()
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Cannot find the task",
+        )
+    etags = parse_etags(if_match)
+    # strong comparison, weak ETags never match
+    if "*" not in etags and get_task_etag(task_id, row.updated_at) not in etags:
+        raise HTTPException(
+            status_code=status.HTTP_412_PRECONDITION_FAILED,
+            detail="Task was changed, get it again",
+        )
+
+
+async def get_tasks_version(session: AsyncSession, user_id: int) -> tuple[int, dt.datetime | None]:
+    """
+    Get version and time of the last change of user's tasks,
+    it is a primary key lookup, so lists are revalidated without reading tasks.
+    """
+    stmt = select(TaskCounter.version, TaskCounter.updated_at).where(TaskCounter.user_id == user_id)
+    row = (await session.execute(stmt)).one_or_none()
+    if row is None:
+        return 0, None
+    return row.version, row.updated_at
+
+
+def get_tasks_list_etag(user_id: int, version: int, query: str) -> str:
+    """ Strong ETag of tasks list, it depends on version of user's tasks and query parameters """
+    digest = hashlib.sha256(f"{user_id}:{version}:{query}".encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+async def update_tasks(
+        session: AsyncSession,
+        user_id: int,
+        ids: list[int],
+        changes: dict,
+) -> tuple[Sequence[RowMapping], int | None]:
+    """
+    Update user's tasks by ids, increase version of user's tasks and return rows of TASK_COLUMNS
+    and the version, it's None if no task is found and nothing is changed.
+    On PostgreSQL it's one statement: locked old rows and version upsert are CTEs of the UPDATE,
+    change of the done counter is computed from old is_done by the upsert,
+    which reads old rows before it locks the counter row.
+    SQLite doesn't support DML in CTEs, so old rows are read before the version is increased.
+    """
+    tasks = Task.__table__
+    conditions = (tasks.c.user_id == user_id, tasks.c.id.in_(ids))
+    columns = [tasks.c[column.key] for column in TASK_COLUMNS]
+
+    connection = await session.connection()
+    if connection.dialect.name == "postgresql":
+        old_tasks = (
+            select(tasks.c.id, tasks.c.is_done)
+            .where(*conditions)
+            .order_by(tasks.c.id)
+            .with_for_update()
+            .cte("old_tasks")
+        )
+        if "is_done" in changes:
+            done = func.sum(int(changes["is_done"]) - cast(old_tasks.c.is_done, Integer))
+        else:
+            done = literal(0)
+        counter = _get_tasks_version_upsert(
+            connection.dialect.name,
+            # no rows, so version isn't increased, if no task is found
+            select(literal(user_id), literal(0), done, literal(1), func.now())
+            .select_from(old_tasks)
+            .having(func.count() > 0),
+        ).cte("counter")
+        stmt = (
+            update(tasks)
+            .where(tasks.c.id == old_tasks.c.id)
+            .values(**changes, sync_version=select(counter.c.version).scalar_subquery())
+            .returning(*columns, tasks.c.sync_version)
+        )
+        rows = (await session.execute(stmt)).mappings().all()
+        return rows, rows[0]["sync_version"] if rows else None
+
+    old_tasks = (await session.execute(select(tasks.c.id, tasks.c.is_done).where(*conditions))).all()
+    if not old_tasks:
+        return [], None
+    done = 0
+    if "is_done" in changes:
+        done = sum(int(changes["is_done"]) - task.is_done for task in old_tasks)
+    version = await bump_tasks_version(session, user_id, done=done)
+    stmt = (
+        update(tasks)
+        .where(tasks.c.id.in_([task.id for task in old_tasks]))
+        .values(**changes, sync_version=version)
+        .returning(*columns)
+    )
+    return (await session.execute(stmt)).mappings().all(), version
+
+
+async def get_task_stats(session: AsyncSession, user_id: int, window_hours: int) -> TaskStats:
+    """
+    Read counters of user's tasks, their cost doesn't depend on number of tasks.
+    created_in_window isn't a counter: it's a range count over (user_id, created_at) index,
+    so its cost grows with number of tasks created in the window.
+    """
+    # naive UTC as created_at is timestamp without time zone
+    window_start = dt.datetime.utcnow() - dt.timedelta(hours=window_hours)
+    stmt = select(
+        select(TaskCounter.total).where(TaskCounter.user_id == user_id).scalar_subquery().label("total"),
+        select(TaskCounter.done).where(TaskCounter.user_id == user_id).scalar_subquery().label("done"),
+        select(func.count())
+        .where(Task.user_id == user_id, Task.created_at >= window_start)
+        .scalar_subquery()
+        .label("created_in_window"),
+    )
+    row = (await session.execute(stmt)).one()
+    total = row.total or 0
+    done = row.done or 0
+    return TaskStats(
+        total=total,
+        done=done,
+        open=total - done,
+        created_in_window=row.created_in_window,
+        window_hours=window_hours,
+    )
+
+
+def _tasks_to_ndjson(tasks: Sequence[RowMapping]) -> bytes:
+    return b"".join(to_json(dict(task)) + b"\n" for task in tasks)
+
+
+def _tasks_to_csv(tasks: Sequence[RowMapping], with_header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if with_header:
+        writer.writerow([column.key for column in TASK_COLUMNS])
+    for task in tasks:
+        writer.writerow([
+            value.isoformat() if isinstance(value, dt.datetime) else value
+            for value in task.values()
+        ])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def stream_tasks(
+        session: AsyncSession,
+        stmt: Select,
+        export_format: FileFormat,
+) -> AsyncIterator[bytes]:
+    """
+    Stream rows of TASK_COLUMNS selected by stmt from server-side cursor,
+    EXPORT_CHUNK_SIZE rows at once, so memory usage doesn't depend on number of rows.
+    If client disconnects, the generator is cancelled and the cursor is closed.
+    """
+    result = await session.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    try:
+        if export_format == FileFormat.csv:
+            yield _tasks_to_csv([], with_header=True)
+        async for tasks in result.mappings().partitions():
+            if export_format == FileFormat.csv:
+                yield _tasks_to_csv(tasks)
+            else:
+                yield _tasks_to_ndjson(tasks)
+    finally:
+        await result.close()
+
+
+# columns of tasks table filled by import
+IMPORT_COLUMNS = ("title", "description", "is_done", "user_id", "created_at", "updated_at", "sync_version")
+
+
+async def _iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """ Split stream of utf-8 bytes into lines without reading it whole """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    async for chunk in stream:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+
+async def _iter_ndjson_records(stream: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, str]]:
+    """ Yield (line number, JSON string) for every non-empty line """
+    line_number = 0
+    async for line in _iter_lines(stream):
+        line_number += 1
+        if line.strip():
+            yield line_number, line
+
+
+async def _iter_csv_records(stream: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, dict | ValueError]]:
+    """
+    Yield (line number, dict of values) for every CSV record.
+    The first record is the header. Quoted values may contain line breaks.
+    A record longer than MAX_CSV_RECORD_LINES or MAX_CSV_RECORD_LENGTH is yielded as ValueError,
+    parsing goes on from the next line.
+    """
+    header = None
+    record_lines = []
+    record_length = 0
+    record_line_number = 0
+    is_quoted = False
+    line_number = 0
+    async for line in _iter_lines(stream):
+        line_number += 1
+        if not record_lines:
+            record_line_number = line_number
+        record_lines.append(line)
+        record_length += len(line) + 1
+        if line.count('"') % 2:
+            # quoted value is opened or closed on this line
+            is_quoted = not is_quoted
+
+        if len(record_lines) > MAX_CSV_RECORD_LINES or record_length > MAX_CSV_RECORD_LENGTH:
+            if header is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="CSV header is too long",
+                )
+            yield record_line_number, ValueError(
+                f"record is longer than {MAX_CSV_RECORD_LINES} lines or {MAX_CSV_RECORD_LENGTH} characters"
+            )
+            record_lines = []
+            record_length = 0
+            is_quoted = False
+            continue
+        if is_quoted:
+            # quoted value continues on the next line
+            continue
+
+        record = "\n".join(record_lines)
+        record_lines = []
+        record_length = 0
+        if not record.strip():
+            continue
+
+        values = next(csv.reader([record]))
+        if header is None:
+            header = values
+            if "title" not in header:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="CSV header must contain title column",
+                )
+            continue
+        # empty values are treated as missing ones
+        yield record_line_number, {key: value for key, value in zip(header, values) if value != ""}
+
+
+def _get_copy_records(rows: list[dict]) -> list[tuple]:
+    """ Make records of IMPORT_COLUMNS for COPY, asyncpg encodes only naive datetimes as timestamp """
+    return [tuple(row[column] for column in IMPORT_COLUMNS) for row in rows]
+
+
+async def _insert_tasks(session: AsyncSession, broker: Broker, rows: list[dict]) -> None:
+    """
+    Insert batch of rows of one user, publish event and commit.
+    COPY is used on PostgreSQL, multi-row INSERT on other databases.
+    """
+    user_id = rows[0]["user_id"]
+    version = await bump_tasks_version(
+        session,
+        user_id,
+        total=len(rows),
+        done=sum(row["is_done"] for row in rows),
+    )
+    for row in rows:
+        row["sync_version"] = version
+
+    connection = await session.connection()
+    if connection.dialect.name == "postgresql":
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            Task.__tablename__,
+            records=_get_copy_records(rows),
+            columns=IMPORT_COLUMNS,
+        )
+    else:
+        await session.execute(insert(Task), rows)
+    # ids of copied rows are unknown
+    await broker.publish(session, TaskEvent(TaskEventType.created, user_id, version))
+    await session.commit()
+
+
+async def import_tasks_from_stream(
+        session: AsyncSession,
+        user_id: int,
+        stream: AsyncIterator[bytes],
+        import_format: FileFormat,
+        broker: Broker,
+) -> ImportResult:
+    """
+    Validate records from stream by AddNewTask and insert valid ones
+    by batches of IMPORT_BATCH_SIZE rows. Invalid records are skipped and reported.
+    """
+    start = time.perf_counter()
+    # COPY doesn't apply column defaults, so timestamps are set explicitly,
+    # naive UTC as columns are timestamp without time zone
+    now = dt.datetime.utcnow()
+
+    if import_format == FileFormat.csv:
+        records = _iter_csv_records(stream)
+    else:
+        records = _iter_ndjson_records(stream)
+
+    imported = 0
+    failed = 0
+    errors = []
+    rows = []
+    async for line_number, record in records:
+        try:
+            if isinstance(record, ValueError):
+                # record couldn't be parsed
+                raise record
+            if isinstance(record, str):
+                task_schema = AddNewTask.model_validate_json(record)
+            else:
+                task_schema = AddNewTask.model_validate(record)
+        except ValueError as e:
+            failed += 1
+            if len(errors) < MAX_IMPORT_ERRORS:
+                if isinstance(e, ValidationError):
+                    error = "; ".join(
+                        f"{'.'.join(map(str, error['loc']))}: {error['msg']}" if error["loc"] else error["msg"]
+                        for error in e.errors()
+                    )
+                else:
+                    error = str(e)
+                errors.append(ImportLineError(line=line_number, error=error))
+            continue
+
+        rows.append({**task_schema.model_dump(), "user_id": user_id, "created_at": now, "updated_at": now})
+        if len(rows) >= IMPORT_BATCH_SIZE:
+            await _insert_tasks(session, broker, rows)
+            imported += len(rows)
+            rows = []
+
+    if rows:
+        await _insert_tasks(session, broker, rows)
+        imported += len(rows)
+
+    elapsed_seconds = time.perf_counter() - start
+    return ImportResult(
+        imported=imported,
+        failed=failed,
+        errors=errors,
+        elapsed_seconds=elapsed_seconds,
+        rows_per_second=imported / elapsed_seconds if elapsed_seconds else 0,
+    )
+
+
+def format_sse_event(event: TaskEvent) -> str:
+    """
+    Format event as server-sent event.
+    Its id is version of user's tasks, missed changes are got from GET /tasks/changes.
+    """
+    data = json.dumps(
+        {"type": event.type.value, "version": event.version, "task_ids": event.task_ids},
+        separators=(",", ":"),
+    )
+    lines = [f"event: {event.type.value}"]
+    if event.type != TaskEventType.reset:
+        lines.append(f"id: {event.version}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_task_events(
+        broker: Broker,
+        subscription: Subscription,
+        heartbeat_seconds: float,
+) -> AsyncIterator[str]:
+    """
+    Yield events of the subscription as server-sent events,
+    comment is sent if there are no events for `heartbeat_seconds`.
+    Subscription is closed when the client disconnects.
+    """
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), heartbeat_seconds)
+            except asyncio.TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            yield format_sse_event(event)
+    finally:
+        broker.unsubscribe(subscription)
@@ -1,9 +1,14 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import Response
 
+from api.middleware import MetricsMiddleware, ReadYourWritesMiddleware
+from api.responses import PydanticJSONResponse
 from api.v1 import router as router_v1
-from config import get_settings
-
-settings = get_settings()
+from db.session import SessionManager
+from db.utils import PasswordHasher
+from events import BrokerManager
 
 tags_metadata = [
     {
@@ -25,11 +30,27 @@ def bind_routers(application: FastAPI):
     application.include_router(router_v1)
 
 
-def get_app() -> FastAPI:
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    # create engine with its connection pool once per process
+    session_manager = SessionManager()
+    password_hasher = PasswordHasher()
+    broker_manager = BrokerManager()
+    yield
+    await broker_manager.close()
+    await session_manager.dispose()
+    password_hasher.shutdown()
+
+
+def get_app(default_response_class: type[Response] = PydanticJSONResponse) -> FastAPI:
     application = FastAPI(
         title="Task Api",
         version="0.1.0",
+        lifespan=lifespan,
+        default_response_class=default_response_class,
     )
+    application.add_middleware(ReadYourWritesMiddleware)
+    application.add_middleware(MetricsMiddleware)
     bind_routers(application)
     return application
 
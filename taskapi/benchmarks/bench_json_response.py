@@ -0,0 +1,76 @@
+"""
+Benchmark of JSON serialization of task lists.
+
+Compares throughput of
+* "default": endpoint returns TasksPage, FastAPI validates it by response_model,
+  converts it to dict and JSONResponse dumps it with json module
+* "pydantic": endpoint returns PydanticJSONResponse, pydantic-core dumps the model to bytes once
+
+Requests are sent in-process through ASGI, database is not used.
+
+Run from taskapi directory:
+    python -m benchmarks.bench_json_response --tasks 1000 10000 --repeat 20
+"""
+import argparse
+import asyncio
+import datetime as dt
+import time
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from httpx import AsyncClient
+
+from api.responses import PydanticJSONResponse
+from api.v1.endpoints.tasks.schemas import Task as TaskSchema, TasksPage
+
+
+def make_page(number_of_tasks: int) -> TasksPage:
+    now = dt.datetime.now()
+    return TasksPage(items=[
+        TaskSchema(
+            id=i,
+            title=f"title_{i}",
+            description=f"description_{i}",
+            is_done=i % 2 == 0,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(number_of_tasks)
+    ])
+
+
+def make_app(page: TasksPage) -> FastAPI:
+    application = FastAPI(default_response_class=JSONResponse)
+
+    @application.get("/default", response_model=TasksPage)
+    async def default():
+        return page
+
+    @application.get("/pydantic", response_model=TasksPage)
+    async def pydantic():
+        return PydanticJSONResponse(page)
+
+    return application
+
+
+async def main(tasks: list[int], repeat: int) -> None:
+    for number_of_tasks in tasks:
+        page = make_page(number_of_tasks)
+        async with AsyncClient(app=make_app(page), base_url="http://benchmark") as client:
+            print(f"tasks: {number_of_tasks}, repeat: {repeat}")
+            for url in ["/default", "/pydantic"]:
+                await client.get(url)  # warm up
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    response = await client.get(url)
+                    assert response.status_code == 200
+                elapsed = time.perf_counter() - start
+                print(f"{url:>10}: {elapsed / repeat * 1000:.2f} ms/request, {repeat / elapsed:.1f} requests/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.repeat))
@@ -0,0 +1,82 @@
+"""
+Profile of application cold start.
+
+Every run starts a fresh interpreter, imports `app:app` and runs its lifespan startup.
+Median time of import and startup is printed together with modules
+which take most time to import (by `python -X importtime`).
+
+Run from taskapi directory:
+    python -m benchmarks.bench_startup --repeat 5 --top 15 --max-ms 3000
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# code run in a fresh interpreter, prints timings as JSON
+STARTUP_CODE = """
+import asyncio, json, time
+start = time.perf_counter()
+from app import app, lifespan
+imported = time.perf_counter()
+
+async def startup():
+    async with lifespan(app):
+        return time.perf_counter()
+
+started = asyncio.run(startup())
+print(json.dumps({"import_ms": (imported - start) * 1000, "startup_ms": (started - imported) * 1000}))
+"""
+
+
+def measure_startup() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_CODE],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def get_slowest_imports(top: int) -> list[tuple[str, int, int]]:
+    """ Get (module, self time in us, cumulative time in us) of modules with the greatest self time """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_time, cumulative_time, module = line.removeprefix("import time:").split("|")
+        modules.append((module.strip(), int(self_time), int(cumulative_time)))
+    return sorted(modules, key=lambda module: module[1], reverse=True)[:top]
+
+
+def main(repeat: int, top: int, max_ms: float | None) -> None:
+    runs = [measure_startup() for _ in range(repeat)]
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    startup_ms = statistics.median(run["startup_ms"] for run in runs)
+    print(f"import app:app: {import_ms:.0f} ms, lifespan startup: {startup_ms:.0f} ms (median of {repeat})")
+
+    print(f"{'self ms':>8} {'cumulative ms':>14}  module")
+    for module, self_time, cumulative_time in get_slowest_imports(top):
+        print(f"{self_time / 1000:>8.1f} {cumulative_time / 1000:>14.1f}  {module}")
+
+    total_ms = import_ms + startup_ms
+    if max_ms is not None and total_ms > max_ms:
+        print(f"Cold start {total_ms:.0f} ms is longer than {max_ms:.0f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, help="fail if import and startup take longer")
+    args = parser.parse_args()
+    main(args.repeat, args.top, args.max_ms)
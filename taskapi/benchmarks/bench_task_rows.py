@@ -0,0 +1,84 @@
+"""
+Micro-benchmark of reading tasks: ORM objects vs plain rows.
+
+Compares per-row cost of
+* "orm": select(Task) + TaskSchema.model_validate(task, from_attributes=True)
+* "rows": select(*TASK_COLUMNS) + validation of mappings by TasksPage
+
+Run from taskapi directory:
+    python -m benchmarks.bench_task_rows --rows 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from api.v1.endpoints.tasks.schemas import Task as TaskSchema, TasksPage
+from api.v1.endpoints.tasks.utils import TASK_COLUMNS
+from db.models import Task, User
+from db.models.base_model import BaseModel
+
+
+async def seed(session_maker: async_sessionmaker, number_of_rows: int) -> int:
+    async with session_maker() as session:
+        user = User(email="benchmark@email.com", password_hash="")
+        session.add(user)
+        await session.commit()
+
+        rows = [
+            {
+                "title": f"title_{i}",
+                "description": f"description_{i}",
+                "is_done": i % 2 == 0,
+                "user_id": user.id,
+            }
+            for i in range(number_of_rows)
+        ]
+        await session.execute(insert(Task), rows)
+        await session.commit()
+        return user.id
+
+
+async def read_orm(session_maker: async_sessionmaker, user_id: int) -> int:
+    async with session_maker() as session:
+        result = await session.scalars(select(Task).where(Task.user_id == user_id))
+        tasks = [TaskSchema.model_validate(task, from_attributes=True) for task in result.all()]
+        return len(tasks)
+
+
+async def read_rows(session_maker: async_sessionmaker, user_id: int) -> int:
+    async with session_maker() as session:
+        result = await session.execute(select(*TASK_COLUMNS).where(Task.user_id == user_id))
+        page = TasksPage(items=result.mappings().all())
+        return len(page.items)
+
+
+async def main(number_of_rows: int, repeat: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(BaseModel.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    user_id = await seed(session_maker, number_of_rows)
+
+    print(f"rows: {number_of_rows}, repeat: {repeat}")
+    for name, read in [("orm", read_orm), ("rows", read_rows)]:
+        await read(session_maker, user_id)  # warm up
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            assert await read(session_maker, user_id) == number_of_rows
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{name:>5}: best {best * 1000:.1f} ms, {best / number_of_rows * 1e6:.2f} us/row")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
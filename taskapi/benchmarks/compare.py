@@ -0,0 +1,103 @@
+"""
+Compare benchmark results with a baseline made by benchmarks.load_test.
+
+Scenario regresses if its p50 or p95 latency grew or its throughput dropped
+by more than `tolerance` share of the baseline value, or if it got errors.
+Exits with code 1 on regressions or if runs have different parameters.
+
+Run from taskapi directory:
+    python -m benchmarks.compare benchmarks/baseline.json results.json --tolerance 0.25
+"""
+import argparse
+import json
+import sys
+
+DEFAULT_TOLERANCE = 0.25
+# parameters of runs which must be equal to compare results
+COMPARED_META = ("scale", "users", "mode", "concurrency", "requests", "database")
+
+
+def get_meta_mismatches(baseline: dict, results: dict) -> list[str]:
+    """ Get descriptions of run parameters which differ, results are comparable if there are none """
+    mismatches = []
+    for key in COMPARED_META:
+        expected = baseline["meta"].get(key)
+        actual = results["meta"].get(key)
+        if expected != actual:
+            mismatches.append(f"{key} is {actual!r}, {expected!r} in baseline")
+    return mismatches
+
+
+def compare(baseline: dict, results: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Get descriptions of regressions, empty list if there are none.
+    ValueError is raised if runs have different parameters.
+    """
+    mismatches = get_meta_mismatches(baseline, results)
+    if mismatches:
+        raise ValueError(f"Cannot compare runs with different parameters: {'; '.join(mismatches)}")
+
+    regressions = []
+    for scenario, expected in baseline["results"].items():
+        actual = results["results"].get(scenario)
+        if actual is None:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            limit = expected[metric] * (1 + tolerance)
+            if actual[metric] > limit:
+                regressions.append(
+                    f"{scenario}: {metric} {actual[metric]:.2f} > {limit:.2f} "
+                    f"(baseline {expected[metric]:.2f})"
+                )
+        limit = expected["throughput_rps"] * (1 - tolerance)
+        if actual["throughput_rps"] < limit:
+            regressions.append(
+                f"{scenario}: throughput_rps {actual['throughput_rps']:.1f} < {limit:.1f} "
+                f"(baseline {expected['throughput_rps']:.1f})"
+            )
+        if actual["errors"] > expected["errors"]:
+            regressions.append(f"{scenario}: {actual['errors']} errors (baseline {expected['errors']})")
+    return regressions
+
+
+def print_comparison(baseline: dict, results: dict) -> None:
+    print(f"{'scenario':<26} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18} {'requests/s':>20}")
+    for scenario, actual in results["results"].items():
+        expected = baseline["results"].get(scenario)
+        columns = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            if expected is None:
+                columns.append(f"{actual[metric]:.2f}")
+            else:
+                columns.append(f"{expected[metric]:.2f} -> {actual[metric]:.2f}")
+        print(f"{scenario:<26} {columns[0]:>18} {columns[1]:>18} {columns[2]:>18} {columns[3]:>20}")
+
+
+def check_regressions(baseline: dict, results: dict, tolerance: float) -> bool:
+    """ Print comparison and regressions, returns True if there are no regressions """
+    mismatches = get_meta_mismatches(baseline, results)
+    if mismatches:
+        for mismatch in mismatches:
+            print(f"ERROR cannot compare with baseline, {mismatch}", file=sys.stderr)
+        return False
+
+    print_comparison(baseline, results)
+    regressions = compare(baseline, results, tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    return not regressions
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("results")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    if not check_regressions(load_results(args.baseline), load_results(args.results), args.tolerance):
+        sys.exit(1)
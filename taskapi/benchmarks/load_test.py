@@ -0,0 +1,295 @@
+"""
+Load test of the API with seeded database.
+
+Every scenario sends `--requests` requests with `--concurrency` concurrent clients,
+benchmark users are used round-robin. Latency percentiles and throughput
+of every scenario are printed as JSON and saved to `--output`.
+If `--baseline` is passed, results are compared with it (see benchmarks.compare)
+and the script exits with code 1 on regressions.
+
+Modes:
+* "inprocess": requests are sent to the ASGI app directly, without network
+* "uvicorn": the app is served by uvicorn on a local port in the same process
+* "external": requests are sent to `--base-url`, the server must use `--database-url`
+
+Run from taskapi directory:
+    python -m benchmarks.load_test --scale 100k --mode uvicorn --output results.json
+    python -m benchmarks.load_test --scale 1k --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import datetime as dt
+import itertools
+import json
+import math
+import platform
+import random
+import socket
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable
+
+import uvicorn
+from fastapi import FastAPI
+from httpx import AsyncClient, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import get_app
+from db.models import Task
+from db.session import get_session, get_read_session
+from events import create_broker, get_broker
+
+from .compare import DEFAULT_TOLERANCE, check_regressions, load_results
+from .seed import (
+    BENCHMARK_PASSWORD,
+    DEFAULT_DATABASE_URL,
+    SCALES,
+    count_tasks,
+    create_tables,
+    get_benchmark_email,
+    seed,
+)
+
+MODES = ("inprocess", "uvicorn", "external")
+WARM_UP_REQUESTS = 20
+# number of task ids of every user used by scenarios
+SAMPLED_TASK_IDS = 1000
+
+
+@dataclass
+class BenchmarkUser:
+    headers: dict
+    email: str
+    task_ids: list[int]
+
+
+@dataclass
+class BenchmarkContext:
+    users: list[BenchmarkUser]
+
+    def __post_init__(self):
+        self._users = itertools.cycle(self.users)
+
+    def next_user(self) -> BenchmarkUser:
+        return next(self._users)
+
+
+async def get_task(client: AsyncClient, context: BenchmarkContext) -> Response:
+    user = context.next_user()
+    return await client.get(f"/api/v1/tasks/{random.choice(user.task_ids)}", headers=user.headers)
+
+
+async def list_tasks(client: AsyncClient, context: BenchmarkContext) -> Response:
+    return await client.get("/api/v1/tasks/", params={"limit": 50}, headers=context.next_user().headers)
+
+
+async def list_tasks_by_created_at(client: AsyncClient, context: BenchmarkContext) -> Response:
+    return await client.get(
+        "/api/v1/tasks/",
+        params={"limit": 50, "order_by": "created_at", "order": "desc", "is_done": False},
+        headers=context.next_user().headers,
+    )
+
+
+async def task_stats(client: AsyncClient, context: BenchmarkContext) -> Response:
+    return await client.get("/api/v1/tasks/stats", headers=context.next_user().headers)
+
+
+async def create_task(client: AsyncClient, context: BenchmarkContext) -> Response:
+    return await client.post(
+        "/api/v1/tasks/",
+        json={"title": "benchmark", "description": "benchmark task"},
+        headers=context.next_user().headers,
+    )
+
+
+async def login(client: AsyncClient, context: BenchmarkContext) -> Response:
+    return await client.post(
+        "/api/v1/auth/token",
+        json={"email": context.next_user().email, "password": BENCHMARK_PASSWORD},
+    )
+
+
+Scenario = Callable[[AsyncClient, BenchmarkContext], Awaitable[Response]]
+SCENARIOS: dict[str, Scenario] = {
+    "get_task": get_task,
+    "list_tasks": list_tasks,
+    "list_tasks_by_created_at": list_tasks_by_created_at,
+    "task_stats": task_stats,
+    "create_task": create_task,
+    "login": login,
+}
+
+
+def percentile(sorted_values: list[float], percent: float) -> float:
+    """ Nearest-rank percentile of sorted values """
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+async def run_scenario(
+        client: AsyncClient,
+        context: BenchmarkContext,
+        scenario: Scenario,
+        requests: int,
+        concurrency: int,
+) -> dict:
+    for _ in range(min(WARM_UP_REQUESTS, requests)):
+        await scenario(client, context)
+
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in counter:
+            start = time.perf_counter()
+            response = await scenario(client, context)
+            latencies.append(time.perf_counter() - start)
+            if response.is_error:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "throughput_rps": requests / elapsed,
+    }
+
+
+def make_app(session_maker: async_sessionmaker) -> FastAPI:
+    """ Application using benchmark database and task events broker for it """
+    async def get_benchmark_session():
+        async with session_maker() as session:
+            yield session
+
+    broker = create_broker(session_maker.kw["bind"].url)
+    application = get_app()
+    application.dependency_overrides[get_session] = get_benchmark_session
+    application.dependency_overrides[get_read_session] = get_benchmark_session
+    application.dependency_overrides[get_broker] = lambda: broker
+    return application
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def open_client(mode: str, session_maker: async_sessionmaker, base_url: str | None) -> AsyncIterator[AsyncClient]:
+    if mode == "external":
+        async with AsyncClient(base_url=base_url, timeout=60) as client:
+            yield client
+        return
+
+    application = make_app(session_maker)
+    if mode == "inprocess":
+        async with AsyncClient(app=application, base_url="http://benchmark", timeout=60) as client:
+            yield client
+        return
+
+    port = get_free_port()
+    server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server_task.done():
+            server_task.result()
+        await asyncio.sleep(0.01)
+    try:
+        async with AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            yield client
+    finally:
+        server.should_exit = True
+        await server_task
+
+
+async def make_context(client: AsyncClient, session_maker: async_sessionmaker, user_ids: list[int]) -> BenchmarkContext:
+    users = []
+    async with session_maker() as session:
+        for number, user_id in enumerate(user_ids):
+            task_ids = (await session.scalars(
+                select(Task.id).where(Task.user_id == user_id).limit(SAMPLED_TASK_IDS)
+            )).all()
+            email = get_benchmark_email(number)
+            response = await client.post(
+                "/api/v1/auth/token",
+                json={"email": email, "password": BENCHMARK_PASSWORD},
+            )
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            users.append(BenchmarkUser(headers=headers, email=email, task_ids=list(task_ids)))
+    return BenchmarkContext(users=users)
+
+
+async def main(args: argparse.Namespace) -> dict:
+    engine = create_async_engine(args.database_url)
+    await create_tables(engine)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    user_ids = await seed(session_maker, SCALES[args.scale], args.users)
+    number_of_tasks = await count_tasks(session_maker, user_ids)
+
+    results = {}
+    async with open_client(args.mode, session_maker, args.base_url) as client:
+        context = await make_context(client, session_maker, user_ids)
+        for name in args.scenarios:
+            results[name] = await run_scenario(client, context, SCENARIOS[name], args.requests, args.concurrency)
+            print(f"{name}: {json.dumps(results[name])}", file=sys.stderr)
+    await engine.dispose()
+
+    return {
+        "meta": {
+            "scale": args.scale,
+            "tasks": number_of_tasks,
+            "users": len(user_ids),
+            "mode": args.mode,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "database": engine.dialect.name,
+            "python": platform.python_version(),
+            "created_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--mode", choices=MODES, default="inprocess")
+    parser.add_argument("--base-url", help="url of the server in external mode")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=500, help="number of requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--output", help="path to save results as JSON")
+    parser.add_argument("--baseline", help="path to results to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+    if args.mode == "external" and args.base_url is None:
+        parser.error("--base-url is required in external mode")
+
+    benchmark_results = asyncio.run(main(args))
+    print(json.dumps(benchmark_results, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(benchmark_results, file, indent=2)
+    if args.baseline and not check_regressions(load_results(args.baseline), benchmark_results, args.tolerance):
+        sys.exit(1)
@@ -0,0 +1,123 @@
+"""
+Seed database with users and tasks for benchmarks.
+
+All users have the same password BENCHMARK_PASSWORD,
+tasks are split between users evenly.
+Seeding is skipped if benchmark users already exist.
+
+Run from taskapi directory:
+    python -m benchmarks.seed --database-url sqlite+aiosqlite:///benchmark.db --scale 100k
+"""
+import argparse
+import asyncio
+import datetime as dt
+import time
+
+from sqlalchemy import case, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+
+from db.models import Task, TaskCounter, User
+from db.models.base_model import BaseModel
+from db.utils import generate_password_hash
+
+# number of tasks by scale name
+SCALES = {
+    "1k": 1_000,
+    "100k": 100_000,
+    "1m": 1_000_000,
+}
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:///benchmark.db"
+BENCHMARK_PASSWORD = "benchmark-password"
+INSERT_BATCH_SIZE = 10_000
+
+
+def get_benchmark_email(number: int) -> str:
+    return f"benchmark_{number}@email.com"
+
+
+async def create_tables(engine: AsyncEngine) -> None:
+    """ Create missing tables, migrations should be applied to PostgreSQL instead """
+    async with engine.begin() as connection:
+        await connection.run_sync(BaseModel.metadata.create_all)
+
+
+async def seed(
+        session_maker: async_sessionmaker,
+        number_of_tasks: int,
+        number_of_users: int,
+) -> list[int]:
+    """
+    Create benchmark users and their tasks.
+    Returns ids of benchmark users.
+    """
+    emails = [get_benchmark_email(i) for i in range(number_of_users)]
+    async with session_maker() as session:
+        user_ids = (await session.scalars(
+            select(User.id).where(User.email.in_(emails)).order_by(User.id)
+        )).all()
+        if user_ids:
+            return list(user_ids)
+
+        # hashing is slow, so all users share one hash
+        password_hash = generate_password_hash(BENCHMARK_PASSWORD)
+        user_ids = (await session.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{"email": email, "password_hash": password_hash} for email in emails],
+        )).all()
+
+        start = dt.datetime.now(dt.timezone.utc).replace(tzinfo=None)
+        for batch_start in range(0, number_of_tasks, INSERT_BATCH_SIZE):
+            rows = []
+            for i in range(batch_start, min(batch_start + INSERT_BATCH_SIZE, number_of_tasks)):
+                # distinct timestamps to make ordering by created_at realistic
+                created_at = start - dt.timedelta(seconds=number_of_tasks - i)
+                rows.append({
+                    "title": f"title_{i}",
+                    "description": f"description_{i}",
+                    "is_done": i % 3 == 0,
+                    "user_id": user_ids[i % number_of_users],
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                })
+            await session.execute(insert(Task), rows)
+
+        # counters are maintained by the API, seeded tasks are counted once
+        await session.execute(
+            insert(TaskCounter).from_select(
+                ["user_id", "total", "done", "updated_at"],
+                select(
+                    Task.user_id,
+                    func.count(),
+                    func.sum(case((Task.is_done, 1), else_=0)),
+                    func.now(),
+                ).where(Task.user_id.in_(user_ids)).group_by(Task.user_id),
+            )
+        )
+        await session.commit()
+        return list(user_ids)
+
+
+async def count_tasks(session_maker: async_sessionmaker, user_ids: list[int]) -> int:
+    async with session_maker() as session:
+        return await session.scalar(select(func.count()).where(Task.user_id.in_(user_ids)))
+
+
+async def main(database_url: str, scale: str, users: int) -> None:
+    engine = create_async_engine(database_url)
+    await create_tables(engine)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    start = time.perf_counter()
+    user_ids = await seed(session_maker, SCALES[scale], users)
+    number_of_tasks = await count_tasks(session_maker, user_ids)
+    print(f"users: {len(user_ids)}, tasks: {number_of_tasks}, {time.perf_counter() - start:.1f} s")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    parser.add_argument("--scale", choices=SCALES, default="1k")
+    parser.add_argument("--users", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.scale, args.users))
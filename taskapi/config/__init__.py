@@ -1,6 +1,8 @@
-from .settings import DefaultSettings, get_settings
+from .settings import DefaultSettings, get_settings, reload_settings, override_settings
 
 __all__ = [
     "DefaultSettings",
     "get_settings",
+    "reload_settings",
+    "override_settings",
 ]
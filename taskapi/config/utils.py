@@ -5,3 +5,8 @@ def generate_random_token():
     """ Generate crypto strong random token """
     number_of_bytes = 16
     return secrets.token_hex(number_of_bytes)  # length = number_of_bytes * 2
+
+
+def str_to_bool(value: str) -> bool:
+    """ Convert string value from environment to bool """
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -0,0 +1,51 @@
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from metrics import metrics
+
+
+@dataclass
+class QueryStats:
+    """ Number and total duration (in seconds) of queries made by one request """
+    count: int = 0
+    duration: float = 0.0
+
+
+# set by the metrics middleware for every request
+current_query_stats: ContextVar[QueryStats | None] = ContextVar("current_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    duration = time.perf_counter() - conn.info["metrics_query_start_time"].pop()
+    metrics.db_query_duration.observe(duration)
+    query_stats = current_query_stats.get()
+    if query_stats is not None:
+        query_stats.count += 1
+        query_stats.duration += duration
+
+
+def instrument_engine(engine: Engine) -> None:
+    """ Record duration of every query to metrics and stats of the current request """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """ Default pool of async engines which records time of waiting for a connection """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.db_pool_checkout_duration.observe(time.perf_counter() - start)
@@ -1,8 +1,12 @@
 from .task import Task
+from .task_counter import TaskCounter
+from .task_tombstone import TaskTombstone
 from .user import User
 
 
 __all__ = [
     "Task",
+    "TaskCounter",
+    "TaskTombstone",
     "User"
-]
\ No newline at end of file
+]
@@ -8,6 +8,14 @@ from .base_model import BaseModel
 
 class Task(BaseModel):
     __tablename__ = "tasks"
+    __table_args__ = (
+        # every query is scoped by user_id, listing is ordered by id or (created_at, id)
+        sa.Index(None, "user_id", "id"),
+        sa.Index(None, "user_id", "created_at", "id"),
+        sa.Index(None, "user_id", "idempotency_key", unique=True),
+        # delta sync reads user's tasks changed after a version
+        sa.Index(None, "user_id", "sync_version", "id"),
+    )
 
     id = sa.Column(sa.INTEGER, primary_key=True, autoincrement=True, nullable=False)
     title = sa.Column(sa.VARCHAR(100), nullable=False)
@@ -17,5 +25,14 @@ class Task(BaseModel):
     created_at = sa.Column(sa.DateTime, default=sa.func.now())
     updated_at = sa.Column(sa.DateTime, default=sa.func.now(), onupdate=sa.func.now())
 
+    # client's key of create request, retried request with the same key returns the same task
+    idempotency_key = sa.Column(sa.VARCHAR(64))
+
+    # version of user's tasks (see TaskCounter.version) which created or updated the task last
+    sync_version = sa.Column(sa.BIGINT, nullable=False, default=0, server_default="0")
+
     user_id = sa.Column(sa.INTEGER, sa.ForeignKey("users.id"), nullable=False)
+
+    # PostgreSQL only: generated tsvector column "search_vector" of title and description
+    # with GIN index, it's created by migration and isn't declared here (see tasks search)
     user = relationship("User", backref="tasks")
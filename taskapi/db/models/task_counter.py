@@ -0,0 +1,19 @@
+import sqlalchemy as sa
+
+from .base_model import BaseModel
+
+
+class TaskCounter(BaseModel):
+    """
+    Number of user's tasks, updated in the same transaction as tasks,
+    so statistics are read without counting rows.
+    """
+    __tablename__ = "task_counters"
+
+    user_id = sa.Column(sa.INTEGER, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total = sa.Column(sa.INTEGER, nullable=False, default=0, server_default="0")
+    done = sa.Column(sa.INTEGER, nullable=False, default=0, server_default="0")
+    # increased by every change of user's tasks, used as ETag of tasks list and sync token
+    version = sa.Column(sa.BIGINT, nullable=False, default=0, server_default="0")
+    # time of the last change of user's tasks
+    updated_at = sa.Column(sa.DateTime, default=sa.func.now(), onupdate=sa.func.now())
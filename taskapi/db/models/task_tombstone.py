@@ -0,0 +1,17 @@
+import sqlalchemy as sa
+
+from .base_model import BaseModel
+
+
+class TaskTombstone(BaseModel):
+    """
+    Deleted task, so delta sync of tasks can report deletes.
+    Version is the version of user's tasks (see TaskCounter.version) which deleted the task.
+    """
+    __tablename__ = "task_tombstones"
+
+    # primary key is ordered as changes are read: user's tombstones after a version
+    user_id = sa.Column(sa.INTEGER, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = sa.Column(sa.BIGINT, primary_key=True)
+    task_id = sa.Column(sa.INTEGER, primary_key=True)
+    deleted_at = sa.Column(sa.DateTime, nullable=False)
@@ -3,25 +3,52 @@ from sqlalchemy.ext.hybrid import hybrid_method
 
 from .base_model import BaseModel
 
-from db.utils import generate_password_hash, check_password_hash
+from db.utils import (
+    generate_password_hash,
+    check_password_hash,
+    generate_password_hash_async,
+    check_password_hash_async,
+    password_hash_needs_rehash,
+)
 
 
 class User(BaseModel):
     __tablename__ = "users"
 
     id = sa.Column(sa.INTEGER, primary_key=True, autoincrement=True, nullable=False)
-    email = sa.Column(sa.VARCHAR(255), nullable=False)
+    email = sa.Column(sa.VARCHAR(255), nullable=False, unique=True, index=True)
 
-    # actual length of hash will be 64, using sha256
+    # hash is stored as "{algorithm}${iterations}${salt}${hash}", actual length is ~120
     # length = 128 was made to prevent migrations if hashing algorythm is changed
     password_hash = sa.Column(sa.VARCHAR(128), nullable=False)
 
+    # is written into access tokens, increase it to revoke all user's tokens
+    token_version = sa.Column(sa.INTEGER, nullable=False, default=0, server_default="0")
+
     @hybrid_method
     def set_password(self, password) -> None:
-        """ Set new password_hash by password """
+        """ Set new password_hash by password and revoke old tokens """
         self.password_hash = generate_password_hash(password)
+        self.revoke_tokens()
 
     @hybrid_method
     def check_password(self, password) -> bool:
         """ Check if password is correct """
         return check_password_hash(password, self.password_hash)
+
+    async def set_password_async(self, password) -> None:
+        """ Set new password_hash by password without blocking the event loop """
+        self.password_hash = await generate_password_hash_async(password)
+        self.revoke_tokens()
+
+    async def check_password_async(self, password) -> bool:
+        """ Check if password is correct without blocking the event loop """
+        return await check_password_hash_async(password, self.password_hash)
+
+    def password_needs_rehash(self) -> bool:
+        """ Check if password_hash has outdated format or cost """
+        return password_hash_needs_rehash(self.password_hash)
+
+    def revoke_tokens(self) -> None:
+        """ Make all issued access tokens of the user invalid """
+        self.token_version = (self.token_version or 0) + 1
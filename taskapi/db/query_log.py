@@ -0,0 +1,90 @@
+import hashlib
+import logging
+import random
+import re
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("taskapi.sql")
+
+_STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+# numeric ($1) and named (:name, %(name)s) parameters
+_PARAMETER_RE = re.compile(r"\$\d+|%\(\w+\)s|(?<!:):\w+")
+_NUMBER_LITERAL_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAMETER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_statement(statement: str) -> str:
+    """
+    Replace literals and lists of parameters with placeholders,
+    so the same query with different parameters is normalized the same way.
+    """
+    statement = _STRING_LITERAL_RE.sub("?", statement)
+    statement = _PARAMETER_RE.sub("?", statement)
+    statement = _NUMBER_LITERAL_RE.sub("?", statement)
+    statement = _PARAMETER_LIST_RE.sub("(...)", statement)
+    return _WHITESPACE_RE.sub(" ", statement).strip()
+
+
+def get_statement_fingerprint(statement: str) -> str:
+    """ Short stable id of normalized statement to group queries in logs """
+    return hashlib.sha1(normalize_statement(statement).encode("utf-8")).hexdigest()[:16]
+
+
+class QueryLogger:
+    """
+    Log executed statements as structured records with
+    fingerprint, duration and row count in `extra`.
+    Only `sample_rate` share of queries are logged,
+    queries slower than `slow_query_ms` are always logged with WARNING level.
+    Parameters of statements are never logged.
+    """
+
+    def __init__(self, sample_rate: float = 1.0, slow_query_ms: float | None = None):
+        self.sample_rate = sample_rate
+        self.slow_query_ms = slow_query_ms
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def uninstall(self, engine: Engine) -> None:
+        event.remove(engine, "before_cursor_execute", self.before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", self.after_cursor_execute)
+
+    @staticmethod
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+
+        is_slow = self.slow_query_ms is not None and duration_ms >= self.slow_query_ms
+        if not is_slow and random.random() >= self.sample_rate:
+            return
+
+        level = logging.WARNING if is_slow else logging.INFO
+        if not logger.isEnabledFor(level):
+            return
+
+        fingerprint = get_statement_fingerprint(statement)
+        rowcount = cursor.rowcount
+        logger.log(
+            level,
+            "%s query %s took %.2f ms, rows: %s",
+            "Slow" if is_slow else "SQL",
+            fingerprint,
+            duration_ms,
+            rowcount,
+            extra={
+                "sql_fingerprint": fingerprint,
+                "sql_duration_ms": round(duration_ms, 3),
+                "sql_rowcount": rowcount,
+                "sql_executemany": executemany,
+                "sql_statement": normalize_statement(statement),
+                "sql_slow": is_slow,
+            },
+        )
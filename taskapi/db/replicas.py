@@ -0,0 +1,151 @@
+import itertools
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.datastructures import State
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = "round_robin"
+LEAST_CONNECTIONS = "least_connections"
+REPLICA_SELECTION_STRATEGIES = (ROUND_ROBIN, LEAST_CONNECTIONS)
+
+# cookie with time.time() of the last write committed by the client
+LAST_WRITE_COOKIE = "last_write_at"
+# keys of session.info
+_WRITE_STATE_KEY = "write_state"
+_HAS_WRITES_KEY = "has_writes"
+
+
+class Replica:
+    """ Engine of a read replica with its health state """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.session_maker = async_sessionmaker(engine, expire_on_commit=False)
+        self.healthy = True
+        # time.monotonic() after which unhealthy replica is tried again
+        self.retry_at = 0.0
+
+    @property
+    def checked_out(self) -> int:
+        return self.engine.pool.checkedout()
+
+    def is_available(self, now: float) -> bool:
+        return self.healthy or now >= self.retry_at
+
+    def get_status(self) -> dict:
+        return {
+            "host": self.engine.url.host,
+            "healthy": self.healthy,
+            "checked_out": self.checked_out,
+        }
+
+
+class ReplicaSet:
+    """
+    Choose replica for read-only sessions by round-robin or by least number of checked out connections.
+    Replica which fails to connect is skipped for `retry_seconds`,
+    then the next request tries it again.
+    """
+
+    def __init__(self, replicas: list[Replica], strategy: str = ROUND_ROBIN, retry_seconds: float = 5):
+        if strategy not in REPLICA_SELECTION_STRATEGIES:
+            raise ValueError(f"Unknown replica selection strategy: {strategy}")
+        self.replicas = replicas
+        self.strategy = strategy
+        self.retry_seconds = retry_seconds
+        self._counter = itertools.count()
+
+    def choose(self) -> Replica | None:
+        """ Get replica to read from, None if no replica is available """
+        now = time.monotonic()
+        available = [replica for replica in self.replicas if replica.is_available(now)]
+        if not available:
+            return None
+        if self.strategy == LEAST_CONNECTIONS:
+            return min(available, key=lambda replica: replica.checked_out)
+        return available[next(self._counter) % len(available)]
+
+    def mark_unhealthy(self, replica: Replica) -> None:
+        if replica.healthy:
+            logger.warning("Replica %s is unavailable, reading from primary", replica.engine.url.host)
+        replica.healthy = False
+        replica.retry_at = time.monotonic() + self.retry_seconds
+
+    def mark_healthy(self, replica: Replica) -> None:
+        replica.healthy = True
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+def track_writes(session: AsyncSession, state: State) -> None:
+    """
+    Set `state.last_write_at` when the session commits a transaction which changed data.
+    It is returned to the client in LAST_WRITE_COOKIE, so its next reads go to primary
+    whichever process serves them.
+    """
+    session.info[_WRITE_STATE_KEY] = state
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_execute(orm_execute_state: ORMExecuteState) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_HAS_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _on_flush(session: Session, flush_context) -> None:
+    session.info[_HAS_WRITES_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _on_commit(session: Session) -> None:
+    if session.info.pop(_HAS_WRITES_KEY, False):
+        state = session.info.get(_WRITE_STATE_KEY)
+        if state is not None:
+            state.last_write_at = time.time()
+
+
+@event.listens_for(Session, "after_rollback")
+def _on_rollback(session: Session) -> None:
+    session.info.pop(_HAS_WRITES_KEY, None)
+
+
+def is_recent_write(last_write_at: str | None, window_seconds: float) -> bool:
+    """ Check time from the client's LAST_WRITE_COOKIE is within read-your-writes window """
+    if last_write_at is None:
+        return False
+    try:
+        return time.time() - float(last_write_at) < window_seconds
+    except ValueError:
+        return False
+
+
+async def open_read_session(
+        primary_session_maker: async_sessionmaker,
+        replica_set: ReplicaSet | None,
+        use_primary: bool = False,
+) -> AsyncSession:
+    """
+    Open session on a replica connected in advance,
+    fall back to primary if there are no available replicas or connection fails.
+    """
+    replica = None if use_primary or replica_set is None else replica_set.choose()
+    if replica is not None:
+        session = replica.session_maker()
+        try:
+            await session.connection()
+        except (SQLAlchemyError, OSError):
+            await session.close()
+            replica_set.mark_unhealthy(replica)
+        else:
+            replica_set.mark_healthy(replica)
+            return session
+    return primary_session_maker()
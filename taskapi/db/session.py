@@ -1,18 +1,37 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from fastapi import Request
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 
 from config import get_settings
 
+from .instrumentation import InstrumentedAsyncAdaptedQueuePool, instrument_engine
+from .query_log import QueryLogger
+from .replicas import (
+    LAST_WRITE_COOKIE,
+    Replica,
+    ReplicaSet,
+    is_recent_write,
+    open_read_session,
+    track_writes,
+)
+
 
 class SessionManager:
     """
-    Singleton class to manage database sessions
+    Singleton class to manage database sessions.
+    Engine (and its connection pool) is created once per process,
+    call `dispose()` on application shutdown to close pooled connections.
+    Read-only sessions use replicas if they are configured.
     """
 
     _instance = None
-    engine = None
+    engine: AsyncEngine | None = None
+    session_maker: async_sessionmaker | None = None
+    replica_set: ReplicaSet | None = None
+    read_your_writes_seconds: float = 0
 
     def __init__(self):
-        self.refresh()
+        if self.engine is None:
+            self.refresh()
 
     def __new__(cls):
         if cls._instance is None:
@@ -20,13 +39,90 @@ class SessionManager:
         return cls._instance
 
     def get_session_maker(self) -> async_sessionmaker:
-        return async_sessionmaker(self.engine, expire_on_commit=False)
+        return self.session_maker
+
+    @staticmethod
+    def _create_engine(uri: str) -> AsyncEngine:
+        settings = get_settings()
+        engine = create_async_engine(
+            uri,
+            echo=settings.DATABASE_ECHO,
+            future=True,
+            poolclass=InstrumentedAsyncAdaptedQueuePool,
+            **settings.database_pool_settings,
+        )
+        instrument_engine(engine.sync_engine)
+        if settings.DATABASE_QUERY_LOG:
+            QueryLogger(
+                sample_rate=settings.DATABASE_QUERY_LOG_SAMPLE_RATE,
+                slow_query_ms=settings.DATABASE_SLOW_QUERY_MS,
+            ).install(engine.sync_engine)
+        return engine
+
+    def refresh(self) -> None:
+        """ Create new engines and session makers using actual settings """
+        settings = get_settings()
+        self.engine = self._create_engine(settings.database_uri_async)
+        self.session_maker = async_sessionmaker(self.engine, expire_on_commit=False)
+
+        self.replica_set = None
+        replica_uris = settings.database_replica_uris_async
+        if replica_uris:
+            self.replica_set = ReplicaSet(
+                [Replica(self._create_engine(uri)) for uri in replica_uris],
+                strategy=settings.DATABASE_REPLICA_SELECTION,
+                retry_seconds=settings.DATABASE_REPLICA_RETRY_SECONDS,
+            )
+        self.read_your_writes_seconds = settings.DATABASE_READ_YOUR_WRITES_SECONDS
+
+    async def dispose(self) -> None:
+        """ Close all pooled connections and drop the engines """
+        if self.engine is not None:
+            await self.engine.dispose()
+        if self.replica_set is not None:
+            await self.replica_set.dispose()
+        self.engine = None
+        self.session_maker = None
+        self.replica_set = None
+
+    def get_pool_status(self) -> dict:
+        """ Get current connection pool statistics """
+        pool = self.engine.pool
+        return {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
 
-    def refresh(self):
-        self.engine = create_async_engine(get_settings().database_uri_async, echo=True, future=True)
+    def get_replicas_status(self) -> list[dict]:
+        """ Get health and number of checked out connections of every replica """
+        if self.replica_set is None:
+            return []
+        return [replica.get_status() for replica in self.replica_set.replicas]
 
+    async def open_read_session(self, last_write_at: str | None = None) -> AsyncSession:
+        """
+        Open session to read from a replica.
+        Primary is used if the client wrote recently (read-your-writes)
+        or no replica is available.
+        """
+        use_primary = is_recent_write(last_write_at, self.read_your_writes_seconds)
+        return await open_read_session(self.session_maker, self.replica_set, use_primary=use_primary)
 
-async def get_session() -> AsyncSession:
-    session_maker = SessionManager().get_session_maker()
-    async with session_maker() as session:
+
+async def get_session(request: Request) -> AsyncSession:
+    async with SessionManager().get_session_maker()() as session:
+        # committed writes are reported to the client by ReadYourWritesMiddleware
+        track_writes(session, request.state)
+        yield session
+
+
+async def get_read_session(request: Request) -> AsyncSession:
+    """
+    Session for read-only endpoints, it may be connected to a replica,
+    so data may be a bit stale. Don't write with this session.
+    """
+    session = await SessionManager().open_read_session(request.cookies.get(LAST_WRITE_COOKIE))
+    async with session:
         yield session
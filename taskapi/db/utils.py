@@ -1,14 +1,168 @@
+import asyncio
 import hashlib
+import hmac
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from config import get_settings
 
-def generate_password_hash(password):
-    password_bytes = password.encode('utf-8')
-    salt = hashlib.sha256()
-    salt.update(password_bytes)
-    password_hash = hashlib.pbkdf2_hmac('sha256', password_bytes, salt.digest(), 100000)
-    return password_hash.hex()
+# Password hash format is "{algorithm}${iterations}${salt}${hash}",
+# salt and hash are hex strings.
+# With 16 bytes salt and sha256 the length is ~120, it fits into VARCHAR(128).
+PASSWORD_HASH_ALGORITHM = "pbkdf2_sha256"
+PASSWORD_HASH_SEPARATOR = "$"
+PASSWORD_SALT_BYTES = 16
 
 
-def check_password_hash(password, password_hash):
-    return generate_password_hash(password) == password_hash
+def _pbkdf2_sha256(password: str, salt: bytes, iterations: int) -> str:
+    return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations).hex()
 
+
+def _generate_legacy_password_hash(password: str) -> str:
+    """
+    Hash format used before versioned hashes: salt is sha256 of the password.
+    Only used to check old hashes, they are upgraded on login.
+    """
+    salt = hashlib.sha256(password.encode('utf-8')).digest()
+    return _pbkdf2_sha256(password, salt, 100000)
+
+
+def generate_password_hash(password: str, iterations: int | None = None) -> str:
+    """
+    Hash password with random salt.
+    Number of iterations is PASSWORD_HASH_ITERATIONS setting by default.
+    """
+    if iterations is None:
+        iterations = get_settings().PASSWORD_HASH_ITERATIONS
+    salt = secrets.token_bytes(PASSWORD_SALT_BYTES)
+    password_hash = _pbkdf2_sha256(password, salt, iterations)
+    return PASSWORD_HASH_SEPARATOR.join(
+        [PASSWORD_HASH_ALGORITHM, str(iterations), salt.hex(), password_hash]
+    )
+
+
+def check_password_hash(password: str, password_hash: str) -> bool:
+    """ Check password against hash of any supported format in constant time """
+    if PASSWORD_HASH_SEPARATOR not in password_hash:
+        return hmac.compare_digest(_generate_legacy_password_hash(password), password_hash)
+
+    try:
+        algorithm, iterations, salt, expected_hash = password_hash.split(PASSWORD_HASH_SEPARATOR)
+        iterations = int(iterations)
+        salt = bytes.fromhex(salt)
+    except ValueError:
+        return False
+    if algorithm != PASSWORD_HASH_ALGORITHM:
+        return False
+
+    return hmac.compare_digest(_pbkdf2_sha256(password, salt, iterations), expected_hash)
+
+
+def password_hash_needs_rehash(password_hash: str) -> bool:
+    """
+    Check if hash was made by legacy format or with outdated number of iterations
+    """
+    parts = password_hash.split(PASSWORD_HASH_SEPARATOR)
+    if len(parts) != 4 or parts[0] != PASSWORD_HASH_ALGORITHM:
+        return True
+    return parts[1] != str(get_settings().PASSWORD_HASH_ITERATIONS)
+
+
+class PasswordHasher:
+    """
+    Singleton class to run password hashing in a dedicated thread pool.
+    pbkdf2_hmac releases the GIL, so hashing doesn't block the event loop
+    and runs in parallel with other requests.
+    """
+
+    _instance = None
+    executor: ThreadPoolExecutor | None = None
+
+    def __init__(self):
+        if self.executor is None:
+            self.refresh()
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def refresh(self) -> None:
+        """ Create new thread pool using actual settings """
+        settings = get_settings()
+        self.workers = settings.PASSWORD_HASH_WORKERS
+        self.max_concurrency = settings.PASSWORD_HASH_MAX_CONCURRENCY
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="password_hasher",
+        )
+        self._semaphore = None
+        self._running_lock = threading.Lock()
+        self.waiting = 0
+        # submitted to the pool: queued for a free thread or running
+        self.in_flight = 0
+        # running in worker threads, at most `workers`
+        self.running = 0
+        self.completed = 0
+
+    def shutdown(self) -> None:
+        """ Stop worker threads, waiting for running jobs """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        self.executor = None
+
+    async def run(self, func, *args):
+        """
+        Run func(*args) in the thread pool.
+        Not more than `max_concurrency` jobs are submitted at once,
+        others wait for their turn here.
+        """
+        if self._semaphore is None:
+            # created lazily to be bound to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._run_job, func, args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def _run_job(self, func, args):
+        """ Run func(*args) in a worker thread counting running jobs """
+        with self._running_lock:
+            self.running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._running_lock:
+                self.running -= 1
+
+    def get_status(self) -> dict:
+        """ Get current queue statistics """
+        return {
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "queued": self.in_flight - self.running,
+            "running": self.running,
+            "completed": self.completed,
+        }
+
+
+async def generate_password_hash_async(password) -> str:
+    return await PasswordHasher().run(generate_password_hash, password)
+
+
+async def check_password_hash_async(password, password_hash) -> bool:
+    return await PasswordHasher().run(check_password_hash, password, password_hash)
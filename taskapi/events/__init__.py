@@ -0,0 +1,24 @@
+from .broker import (
+    Broker,
+    BrokerUnavailableError,
+    InMemoryBroker,
+    Subscription,
+    TaskEvent,
+    TaskEventType,
+)
+from .manager import BrokerManager, create_broker, get_broker
+from .postgres import PostgresBroker
+
+
+__all__ = [
+    "Broker",
+    "BrokerUnavailableError",
+    "InMemoryBroker",
+    "Subscription",
+    "TaskEvent",
+    "TaskEventType",
+    "BrokerManager",
+    "create_broker",
+    "get_broker",
+    "PostgresBroker",
+]
@@ -0,0 +1,149 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# more ids don't fit into NOTIFY payload (8000 bytes), clients get changes by sync token instead
+MAX_EVENT_TASK_IDS = 100
+
+
+class BrokerUnavailableError(Exception):
+    """ Broker can't deliver events, e.g. its connection to the database is lost """
+
+
+class TaskEventType(str, Enum):
+    created = "created"
+    updated = "updated"
+    deleted = "deleted"
+    # events may be lost, client must get changes by sync token
+    reset = "reset"
+
+
+@dataclass
+class TaskEvent:
+    type: TaskEventType
+    user_id: int
+    # version of user's tasks which made the change (see TaskCounter.version)
+    version: int = 0
+    # None if too many tasks were changed or their ids are unknown
+    task_ids: list[int] | None = None
+
+    def __post_init__(self):
+        if self.task_ids is not None and len(self.task_ids) > MAX_EVENT_TASK_IDS:
+            self.task_ids = None
+
+    def to_dict(self) -> dict:
+        return {
+            "type": self.type.value,
+            "user_id": self.user_id,
+            "version": self.version,
+            "task_ids": self.task_ids,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "TaskEvent":
+        """ Raises ValueError if payload is invalid """
+        try:
+            data = json.loads(payload)
+            return cls(
+                type=TaskEventType(data["type"]),
+                user_id=int(data["user_id"]),
+                version=int(data["version"]),
+                task_ids=None if data["task_ids"] is None else [int(task_id) for task_id in data["task_ids"]],
+            )
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid task event: {payload!r}") from e
+
+
+class Subscription:
+    """
+    Queue of events of one user for one client.
+    If the client doesn't keep up, queued events are replaced by one reset event.
+    """
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self._queue: asyncio.Queue[TaskEvent] = asyncio.Queue(maxsize=queue_size)
+
+    def put(self, event: TaskEvent) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(TaskEvent(TaskEventType.reset, self.user_id))
+
+    async def get(self) -> TaskEvent:
+        return await self._queue.get()
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+
+class Broker(ABC):
+    """
+    Fan-out of task events to subscribers of their users within the process.
+    Subclasses deliver published events to `dispatch` of brokers of all processes.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscriptions: dict[int, set[Subscription]] = {}
+
+    @property
+    def subscribers_count(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    async def subscribe(self, user_id: int) -> Subscription:
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.user_id]
+
+    def dispatch(self, event: TaskEvent) -> None:
+        """ Put event into queues of its user's subscribers """
+        for subscription in self._subscriptions.get(event.user_id, ()):
+            subscription.put(event)
+
+    def dispatch_reset(self) -> None:
+        """ Tell all subscribers that events may be lost """
+        for user_id, subscriptions in self._subscriptions.items():
+            for subscription in subscriptions:
+                subscription.put(TaskEvent(TaskEventType.reset, user_id))
+
+    @abstractmethod
+    async def publish(self, session: AsyncSession, event: TaskEvent) -> None:
+        """
+        Publish event of the transaction of `session`.
+        Must be called before commit, event is delivered only if the transaction is committed.
+        """
+
+    @abstractmethod
+    async def close(self) -> None:
+        """ Release connections of the broker """
+
+
+class InMemoryBroker(Broker):
+    """
+    Broker of one process for tests and development.
+    Events are dispatched at once, not after commit.
+    """
+
+    async def publish(self, session: AsyncSession, event: TaskEvent) -> None:
+        self.dispatch(event)
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,55 @@
+from sqlalchemy.engine import URL, make_url
+
+from config import get_settings
+
+from .broker import Broker, InMemoryBroker
+from .postgres import PostgresBroker
+
+
+def create_broker(database_uri: str | URL, queue_size: int = 100) -> Broker:
+    """
+    Create broker for the database of the application.
+    LISTEN / NOTIFY needs PostgreSQL, events of other databases are delivered within the process.
+    """
+    url = make_url(database_uri)
+    if url.get_backend_name() != "postgresql":
+        return InMemoryBroker(queue_size)
+    # asyncpg accepts only plain postgresql:// DSN
+    dsn = url.set(drivername="postgresql").render_as_string(hide_password=False)
+    return PostgresBroker(dsn, queue_size=queue_size)
+
+
+class BrokerManager:
+    """
+    Singleton class to hold task events broker of the process,
+    call `close()` on application shutdown to close its connection.
+    """
+
+    _instance = None
+    broker: Broker | None = None
+
+    def __init__(self):
+        if self.broker is None:
+            self.refresh()
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def refresh(self) -> None:
+        """ Create new broker using actual settings """
+        settings = get_settings()
+        self.broker = create_broker(
+            settings.database_uri_sync,
+            queue_size=settings.TASK_EVENTS_QUEUE_SIZE,
+        )
+
+    async def close(self) -> None:
+        if self.broker is not None:
+            await self.broker.close()
+        self.broker = None
+
+
+def get_broker() -> Broker:
+    return BrokerManager().broker
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+
+import asyncpg
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .broker import Broker, BrokerUnavailableError, TaskEvent
+
+logger = logging.getLogger(__name__)
+
+TASK_EVENTS_CHANNEL = "task_events"
+
+
+class PostgresBroker(Broker):
+    """
+    Broker on PostgreSQL LISTEN / NOTIFY.
+    Events are sent by NOTIFY in the transaction which changes tasks,
+    so they are delivered after commit in commit order.
+    Every process holds one LISTEN connection, it is opened on the first subscription.
+    If the connection is lost, subscribers get reset event and it is reopened.
+    """
+
+    def __init__(
+            self,
+            dsn: str,
+            queue_size: int = 100,
+            channel: str = TASK_EVENTS_CHANNEL,
+            reconnect_seconds: float = 1,
+    ):
+        super().__init__(queue_size)
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_seconds = reconnect_seconds
+        self._connection: asyncpg.Connection | None = None
+        self._lock: asyncio.Lock | None = None
+        self._reconnect_task: asyncio.Task | None = None
+
+    async def _connect(self) -> None:
+        if self._lock is None:
+            # created lazily to be bound to the running event loop
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._connection is not None and not self._connection.is_closed():
+                return
+            connection = await asyncpg.connect(self.dsn)
+            connection.add_termination_listener(self._on_termination)
+            await connection.add_listener(self.channel, self._on_notification)
+            self._connection = connection
+
+    async def subscribe(self, user_id: int):
+        try:
+            await self._connect()
+        except (OSError, asyncpg.PostgresError) as e:
+            raise BrokerUnavailableError("Cannot listen to task events") from e
+        return await super().subscribe(user_id)
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = TaskEvent.from_json(payload)
+        except ValueError:
+            logger.warning("Skip invalid task event %r", payload)
+            return
+        self.dispatch(event)
+
+    def _on_termination(self, connection) -> None:
+        logger.warning("Connection listening to task events is lost")
+        self._connection = None
+        self.dispatch_reset()
+        if self.subscribers_count and (self._reconnect_task is None or self._reconnect_task.done()):
+            self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self) -> None:
+        while self.subscribers_count:
+            await asyncio.sleep(self.reconnect_seconds)
+            try:
+                await self._connect()
+            except (OSError, asyncpg.PostgresError):
+                logger.warning("Cannot reconnect to listen to task events, retry in %s s", self.reconnect_seconds)
+                continue
+            # events sent while reconnecting are lost
+            self.dispatch_reset()
+            return
+
+    async def publish(self, session: AsyncSession, event: TaskEvent) -> None:
+        await session.execute(select(func.pg_notify(self.channel, event.to_json())))
+
+    async def close(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            connection.remove_termination_listener(self._on_termination)
+            await connection.close()
@@ -0,0 +1,167 @@
+"""
+In-process metrics collected by the middleware and database instrumentation
+and exposed in Prometheus text format.
+Metrics are kept per process, every worker reports its own values.
+"""
+from bisect import bisect_left
+from typing import Iterable
+
+# buckets in seconds for durations of requests and queries
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# buckets for number of queries made by one request
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# route label of requests which didn't match any route
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    """
+    Histogram with fixed buckets.
+    Observing a value is a binary search and three additions.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple = DURATION_BUCKETS):
+        self.buckets = buckets
+        # the last count is for values greater than the last bucket
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_cumulative_counts(self) -> list[tuple[str, int]]:
+        """ Get (upper bound, number of values <= bound) for every bucket including +Inf """
+        result = []
+        total = 0
+        for bound, count in zip([*self.buckets, "+Inf"], self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+
+class Metrics:
+    """ Registry of all metrics of the application """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests_in_flight = 0
+        # (method, route, status) -> durations of requests
+        self.request_duration: dict[tuple[str, str, str], Histogram] = {}
+        # (method, route) -> number and total time of queries per request
+        self.request_db_queries: dict[tuple[str, str], Histogram] = {}
+        self.request_db_duration: dict[tuple[str, str], Histogram] = {}
+        # all queries, including ones made outside of requests
+        self.db_query_duration = Histogram()
+        self.db_pool_checkout_duration = Histogram()
+
+    def observe_request(
+            self,
+            method: str,
+            route: str,
+            status_code: int,
+            duration: float,
+            db_queries: int,
+            db_duration: float,
+    ) -> None:
+        key = (method, route, str(status_code))
+        histogram = self.request_duration.get(key)
+        if histogram is None:
+            histogram = self.request_duration[key] = Histogram()
+        histogram.observe(duration)
+
+        key = (method, route)
+        histogram = self.request_db_queries.get(key)
+        if histogram is None:
+            histogram = self.request_db_queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+            self.request_db_duration[key] = Histogram()
+        histogram.observe(db_queries)
+        self.request_db_duration[key].observe(db_duration)
+
+
+metrics = Metrics()
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(
+        f'{name}="{_escape_label_value(str(value))}"' for name, value in labels.items()
+    ) + "}"
+
+
+def render_gauge(name: str, description: str, values: Iterable[tuple[dict, float]]) -> list[str]:
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} gauge"]
+    for labels, value in values:
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return lines
+
+
+def render_histogram(name: str, description: str, values: Iterable[tuple[dict, Histogram]]) -> list[str]:
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} histogram"]
+    for labels, histogram in values:
+        for bound, count in histogram.get_cumulative_counts():
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return lines
+
+
+def render_metrics(registry: Metrics) -> list[str]:
+    """ Render all metrics of the registry as lines of Prometheus text format """
+    # dicts are copied, because they may be changed by other threads
+    request_duration = list(registry.request_duration.items())
+    request_db_queries = list(registry.request_db_queries.items())
+    request_db_duration = list(registry.request_db_duration.items())
+    return [
+        *render_gauge(
+            "http_requests_in_flight",
+            "Number of requests being processed",
+            [({}, registry.requests_in_flight)],
+        ),
+        *render_histogram(
+            "http_request_duration_seconds",
+            "Duration of requests by route",
+            [
+                ({"method": method, "route": route, "status": status_code}, histogram)
+                for (method, route, status_code), histogram in request_duration
+            ],
+        ),
+        *render_histogram(
+            "http_request_db_queries",
+            "Number of database queries per request",
+            [
+                ({"method": method, "route": route}, histogram)
+                for (method, route), histogram in request_db_queries
+            ],
+        ),
+        *render_histogram(
+            "http_request_db_duration_seconds",
+            "Total duration of database queries per request",
+            [
+                ({"method": method, "route": route}, histogram)
+                for (method, route), histogram in request_db_duration
+            ],
+        ),
+        *render_histogram(
+            "db_query_duration_seconds",
+            "Duration of database queries",
+            [({}, registry.db_query_duration)],
+        ),
+        *render_histogram(
+            "db_pool_checkout_duration_seconds",
+            "Time spent waiting for a connection from the pool",
+            [({}, registry.db_pool_checkout_duration)],
+        ),
+    ]
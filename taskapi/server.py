@@ -0,0 +1,91 @@
+"""
+Production server entry point.
+
+Runs the application by uvicorn in several worker processes,
+every worker has its own engine and connection pool,
+they are closed by the application lifespan on graceful shutdown.
+Note that workers may open up to
+SERVER_WORKERS * (DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW) database connections.
+
+Run from taskapi directory:
+    python server.py --host 0.0.0.0 --port 8000
+"""
+import argparse
+import importlib.util
+import logging
+import os
+
+import uvicorn
+
+from config import DefaultSettings, get_settings
+
+logger = logging.getLogger("taskapi.server")
+
+
+def get_cpu_count() -> int:
+    """ Number of CPUs available to this process, respects CPU affinity of containers """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_workers_count(settings: DefaultSettings) -> int:
+    if settings.SERVER_WORKERS > 0:
+        return settings.SERVER_WORKERS
+    return get_cpu_count()
+
+
+def _resolve_implementation(value: str, fast_implementation: str, default_implementation: str) -> str:
+    if value != "auto":
+        return value
+    if importlib.util.find_spec(fast_implementation) is not None:
+        return fast_implementation
+    return default_implementation
+
+
+def get_server_config(settings: DefaultSettings, host: str | None = None, port: int | None = None) -> dict:
+    """ Get kwargs of `uvicorn.run` from settings """
+    return {
+        "host": host or settings.APP_HOST,
+        "port": port or settings.APP_PORT,
+        "workers": get_workers_count(settings),
+        "loop": _resolve_implementation(settings.SERVER_LOOP, "uvloop", "asyncio"),
+        "http": _resolve_implementation(settings.SERVER_HTTP, "httptools", "h11"),
+        "backlog": settings.SERVER_BACKLOG,
+        "timeout_keep_alive": settings.SERVER_KEEP_ALIVE_SECONDS,
+        "limit_concurrency": settings.SERVER_LIMIT_CONCURRENCY or None,
+        "timeout_graceful_shutdown": settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        "access_log": settings.SERVER_ACCESS_LOG,
+        "lifespan": "on",
+    }
+
+
+def share_secret_key(settings: DefaultSettings) -> None:
+    """
+    Random SECRET_KEY is generated when it isn't set,
+    workers must sign tokens by the same key, so it's passed to them by environment.
+    """
+    if "SECRET_KEY" not in os.environ:
+        logger.warning("SECRET_KEY isn't set, tokens will be invalid after restart")
+        os.environ["SECRET_KEY"] = settings.SECRET_KEY
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", help="default is APP_HOST setting")
+    parser.add_argument("--port", type=int, help="default is APP_PORT setting")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    settings = get_settings()
+    share_secret_key(settings)
+    config = get_server_config(settings, host=args.host, port=args.port)
+    logger.info(
+        "Starting %s workers with %s loop and %s protocol on %s:%s",
+        config["workers"], config["loop"], config["http"], config["host"], config["port"],
+    )
+    uvicorn.run("app:app", **config)
+
+
+if __name__ == "__main__":
+    main()
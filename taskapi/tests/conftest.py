@@ -7,17 +7,25 @@ import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
-from api.v1.endpoints.auth.utils import get_authorization_headers, create_access_token
+from api.v1.endpoints.auth.utils import (
+    get_authorization_headers,
+    create_user_access_token,
+    token_version_cache,
+    token_cache,
+)
 from app import get_app
+from db.instrumentation import instrument_engine
 from db.models import User, Task
 from db.models.base_model import BaseModel
-from db.session import get_session
+from db.session import get_session, get_read_session
+from events import InMemoryBroker, get_broker
 from tests.utils import generate_user, generate_task
 
 TEST_DATABASE_PATH = "test.db"
 TEST_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}"
 
 engine = create_async_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+instrument_engine(engine.sync_engine)
 TestingSessionLocal = async_sessionmaker(
     engine, autocommit=False, autoflush=False, expire_on_commit=False)
 
@@ -51,10 +59,30 @@ async def session(init_db) -> AsyncSession:
             await session.rollback()
 
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Clear in-process caches, SQLite may reuse ids of deleted rows.
+    """
+    yield
+    token_version_cache.clear()
+    token_cache.clear()
+
+
+@pytest.fixture
+def broker() -> InMemoryBroker:
+    """
+    Broker of task events delivering them within the test
+    """
+    return InMemoryBroker()
+
+
 @pytest.fixture
-async def client(session) -> AsyncClient:
+async def client(session, broker) -> AsyncClient:
     app = get_app()
     app.dependency_overrides[get_session] = lambda: session
+    app.dependency_overrides[get_read_session] = lambda: session
+    app.dependency_overrides[get_broker] = lambda: broker
     async with AsyncClient(app=app, base_url="http://testserver") as client:
         yield client
 
@@ -98,9 +126,8 @@ async def auth_client(session, client, user) -> AsyncClient:
     Get authorized client
     """
     # Create access token
-    payload = {"email": user.email}
     expires_delta = dt.timedelta(minutes=30)
-    access_token = create_access_token(payload, expires_delta)
+    access_token = create_user_access_token(user, expires_delta)
 
     # Set authorization headers
     authorization_headers = get_authorization_headers(access_token)
@@ -0,0 +1,68 @@
+from api.v1.endpoints.auth.cache import TTLCache, MISSING
+
+
+class TestTTLCache:
+    def test_get_set(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("key", None)
+
+        assert cache.get("key") is None
+        assert cache.get("unknown_key") is MISSING
+
+    def test_least_recently_used_is_evicted(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("key_1", 1)
+        cache.set("key_2", 2)
+        cache.get("key_1")  # key_2 becomes least recently used
+        cache.set("key_3", 3)
+
+        assert len(cache) == 2
+        assert cache.get("key_1") == 1
+        assert cache.get("key_2") is MISSING
+        assert cache.get("key_3") == 3
+
+    def test_expired(self):
+        cache = TTLCache(maxsize=10, ttl=0)
+        cache.set("key", 1)
+
+        assert cache.get("key") is MISSING
+        assert len(cache) == 0
+
+    def test_pop(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("key", 1)
+        cache.pop("key")
+        cache.pop("unknown_key")
+
+        assert cache.get("key") is MISSING
+        assert cache.removals == 1
+
+    def test_entry_ttl(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("key_1", 1, ttl=0)
+        cache.set("key_2", 2, ttl=1000)  # can't live longer than cache's ttl
+
+        assert cache.get("key_1") is MISSING
+        assert cache.get("key_2") == 2
+
+    def test_pop_where(self):
+        cache = TTLCache(maxsize=10, ttl=60)
+        for value in range(4):
+            cache.set(f"key_{value}", value)
+        cache.pop_where(lambda value: value % 2 == 0)
+
+        assert len(cache) == 2
+        assert cache.get("key_1") == 1
+        assert cache.get_stats()["removals"] == 2
+
+    def test_stats(self):
+        cache = TTLCache(maxsize=1, ttl=60)
+        cache.set("key_1", 1)
+        cache.set("key_2", 2)
+        cache.get("key_1")
+        cache.get("key_2")
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["evictions"] == 1
@@ -0,0 +1,80 @@
+import datetime as dt
+
+from api.v1.endpoints.tasks import utils
+from api.v1.endpoints.tasks.schemas import FileFormat
+from api.v1.endpoints.tasks.utils import _iter_lines, _iter_csv_records, _get_copy_records
+from events import InMemoryBroker
+
+
+async def _stream(chunks: list[bytes]):
+    for chunk in chunks:
+        yield chunk
+
+
+class TestIterLines:
+    async def test_lines_split_between_chunks(self):
+        text = "first line\r\nвторая строка\nlast line"
+        data = text.encode("utf-8")
+        # split in the middle of multibyte characters
+        chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+
+        lines = [line async for line in _iter_lines(_stream(chunks))]
+        assert lines == ["first line", "вторая строка", "last line"]
+
+
+class TestIterCsvRecords:
+    async def test_multiline_value(self):
+        data = b'title,description\ntitle_1,"a\n""quoted""\nvalue"\ntitle_2,b\n'
+
+        records = [record async for record in _iter_csv_records(_stream([data]))]
+        assert records == [
+            (2, {"title": "title_1", "description": 'a\n"quoted"\nvalue'}),
+            (5, {"title": "title_2", "description": "b"}),
+        ]
+
+    async def test_unclosed_quote(self, monkeypatch):
+        """
+        Record with unclosed quoted value is reported once it exceeds the limit, the rest is parsed
+        """
+        monkeypatch.setattr(utils, "MAX_CSV_RECORD_LINES", 3)
+        data = b'title,description\ntitle_1,"a\nb\nc\nd\ntitle_2,b\n'
+
+        records = [record async for record in _iter_csv_records(_stream([data]))]
+        assert len(records) == 2
+        line_number, error = records[0]
+        assert line_number == 2
+        assert isinstance(error, ValueError)
+        assert records[1] == (6, {"title": "title_2", "description": "b"})
+
+    async def test_too_long_record(self, monkeypatch):
+        monkeypatch.setattr(utils, "MAX_CSV_RECORD_LENGTH", 20)
+        data = b'title,description\ntitle_1,' + b"a" * 20 + b'\ntitle_2,b\n'
+
+        records = [record async for record in _iter_csv_records(_stream([data]))]
+        assert isinstance(records[0][1], ValueError)
+        assert records[1] == (3, {"title": "title_2", "description": "b"})
+
+
+class TestImportRows:
+    async def test_copy_timestamps_are_naive(self, monkeypatch):
+        """
+        asyncpg encodes only naive datetimes into timestamp without time zone columns
+        """
+        inserted_rows = []
+
+        async def _insert_tasks(session, broker, rows):
+            for row in rows:
+                row["sync_version"] = 1
+            inserted_rows.extend(rows)
+
+        monkeypatch.setattr(utils, "_insert_tasks", _insert_tasks)
+        data = b'{"title": "title_1"}\n{"title": "title_2", "is_done": true}\n'
+        result = await utils.import_tasks_from_stream(
+            None, 1, _stream([data]), FileFormat.ndjson, InMemoryBroker()
+        )
+        assert result.imported == 2
+
+        for record in _get_copy_records(inserted_rows):
+            timestamps = [value for value in record if isinstance(value, dt.datetime)]
+            assert len(timestamps) == 2
+            assert all(timestamp.tzinfo is None for timestamp in timestamps)
@@ -0,0 +1,81 @@
+from api.middleware import MetricsMiddleware
+from metrics import Histogram, Metrics, render_histogram, render_metrics
+
+
+class TestHistogram:
+    def test_observe(self):
+        histogram = Histogram(buckets=(1, 5))
+        histogram.observe(0.5)
+        histogram.observe(1)
+        histogram.observe(3)
+        histogram.observe(10)
+
+        assert histogram.count == 4
+        assert histogram.sum == 14.5
+        assert histogram.get_cumulative_counts() == [("1", 2), ("5", 3), ("+Inf", 4)]
+
+    def test_render(self):
+        histogram = Histogram(buckets=(1,))
+        histogram.observe(2)
+
+        assert render_histogram("duration", "Duration", [({"route": 'a"b'}, histogram)]) == [
+            "# HELP duration Duration",
+            "# TYPE duration histogram",
+            'duration_bucket{route="a\\"b",le="1"} 0',
+            'duration_bucket{route="a\\"b",le="+Inf"} 1',
+            'duration_sum{route="a\\"b"} 2.0',
+            'duration_count{route="a\\"b"} 1',
+        ]
+
+
+class TestMetrics:
+    def test_observe_request(self):
+        registry = Metrics()
+        registry.observe_request("GET", "/tasks", 200, duration=0.01, db_queries=2, db_duration=0.005)
+        registry.observe_request("GET", "/tasks", 200, duration=0.02, db_queries=3, db_duration=0.005)
+
+        assert registry.request_duration[("GET", "/tasks", "200")].count == 2
+        assert registry.request_db_queries[("GET", "/tasks")].sum == 5
+        assert registry.request_db_duration[("GET", "/tasks")].sum == 0.01
+
+        lines = render_metrics(registry)
+        assert 'http_request_db_queries_count{method="GET",route="/tasks"} 2' in lines
+
+
+class TestMetricsMiddleware:
+    @staticmethod
+    def make_app(content_type: bytes):
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+            await send({"type": "http.response.body", "body": b""})
+        return app
+
+    @staticmethod
+    async def call(middleware: MetricsMiddleware, registry: Metrics) -> int:
+        """ Call middleware and return number of requests in flight while response is sent """
+        in_flight = []
+
+        async def send(message):
+            in_flight.append(registry.requests_in_flight)
+
+        await middleware({"type": "http", "method": "GET"}, None, send)
+        return in_flight[-1]
+
+    async def test_request_is_observed(self):
+        registry = Metrics()
+        middleware = MetricsMiddleware(self.make_app(b"application/json"), registry)
+
+        assert await self.call(middleware, registry) == 1
+        assert registry.requests_in_flight == 0
+        assert registry.request_duration[("GET", "unmatched", "200")].count == 1
+
+    async def test_event_stream_is_not_observed(self):
+        """
+        Event stream isn't a request in flight and its duration is how long client is connected
+        """
+        registry = Metrics()
+        middleware = MetricsMiddleware(self.make_app(b"text/event-stream; charset=utf-8"), registry)
+
+        assert await self.call(middleware, registry) == 0
+        assert registry.requests_in_flight == 0
+        assert registry.request_duration == {}
@@ -0,0 +1,27 @@
+import datetime as dt
+import json
+
+from api.responses import PydanticJSONResponse
+from api.v1.endpoints.tasks.schemas import Task as TaskSchema, TasksPage
+
+
+class TestPydanticJSONResponse:
+    def test_render_model(self):
+        created_at = dt.datetime(2023, 7, 1, 12, 0, 0)
+        page = TasksPage(
+            items=[TaskSchema(id=1, title="title", created_at=created_at)],
+            next_cursor="cursor",
+        )
+
+        response = PydanticJSONResponse(page)
+
+        data = json.loads(response.body)
+        assert data["next_cursor"] == "cursor"
+        assert data["items"][0]["created_at"] == created_at.isoformat()
+        assert TasksPage.model_validate(data) == page
+
+    def test_render_jsonable(self):
+        response = PydanticJSONResponse({"detail": "Cannot find the task"}, status_code=404)
+
+        assert response.status_code == 404
+        assert json.loads(response.body) == {"detail": "Cannot find the task"}
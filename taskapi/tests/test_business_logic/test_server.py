@@ -0,0 +1,29 @@
+from config import override_settings
+from server import get_cpu_count, get_server_config
+
+
+class TestServerConfig:
+    def test_workers_from_cpu_count(self):
+        with override_settings(SERVER_WORKERS=0, SERVER_LIMIT_CONCURRENCY=0) as settings:
+            config = get_server_config(settings)
+
+        assert config["workers"] == get_cpu_count()
+        assert config["limit_concurrency"] is None
+        assert config["host"] == settings.APP_HOST
+
+    def test_settings_are_used(self):
+        with override_settings(
+                SERVER_WORKERS=3,
+                SERVER_LOOP="asyncio",
+                SERVER_HTTP="h11",
+                SERVER_LIMIT_CONCURRENCY=100,
+                SERVER_KEEP_ALIVE_SECONDS=10,
+        ) as settings:
+            config = get_server_config(settings, host="0.0.0.0", port=9000)
+
+        assert config["workers"] == 3
+        assert config["loop"] == "asyncio"
+        assert config["http"] == "h11"
+        assert config["limit_concurrency"] == 100
+        assert config["timeout_keep_alive"] == 10
+        assert (config["host"], config["port"]) == ("0.0.0.0", 9000)
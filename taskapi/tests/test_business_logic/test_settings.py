@@ -0,0 +1,27 @@
+from config import get_settings, override_settings, reload_settings
+from db.utils import generate_password_hash, password_hash_needs_rehash
+
+
+class TestSettings:
+    def test_settings_are_cached(self):
+        assert get_settings() is get_settings()
+        assert get_settings().SECRET_KEY == get_settings().SECRET_KEY
+
+    def test_override_settings(self):
+        original = get_settings()
+        with override_settings(PASSWORD_HASH_ITERATIONS=1000) as settings:
+            assert get_settings() is settings
+            assert settings.PASSWORD_HASH_ITERATIONS == 1000
+            assert settings.SECRET_KEY == original.SECRET_KEY
+            assert not password_hash_needs_rehash(generate_password_hash("password"))
+        assert get_settings() is original
+
+    def test_reload_settings(self, monkeypatch):
+        original = get_settings()
+        monkeypatch.setenv("ACCESS_TOKEN_EXPIRE_MINUTES", "5")
+        try:
+            assert reload_settings().ACCESS_TOKEN_EXPIRE_MINUTES == 5
+            assert get_settings() is not original
+        finally:
+            monkeypatch.undo()
+            reload_settings()
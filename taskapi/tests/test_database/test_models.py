@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from db.models import User
+
+
+class TestUser:
+    async def test_email_is_unique(self, session, user):
+        """
+        Test database rejects the second user with the same email
+        """
+        duplicate_user = User(
+            email=user.email,
+        )
+        duplicate_user.set_password("some_raw_password")
+        session.add(duplicate_user)
+
+        with pytest.raises(IntegrityError):
+            await session.commit()
+        await session.rollback()
@@ -0,0 +1,62 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from db.query_log import QueryLogger, get_statement_fingerprint, normalize_statement
+
+
+class TestQueryLog:
+    def test_normalize_statement(self):
+        """
+        Test literals and parameter lists are replaced with placeholders
+        """
+        assert normalize_statement(
+            "SELECT * FROM tasks\n  WHERE id IN (?, ?, ?) AND title = 'abc' AND user_id = 5"
+        ) == "SELECT * FROM tasks WHERE id IN (...) AND title = ? AND user_id = ?"
+
+    def test_fingerprint_ignores_parameters(self):
+        assert get_statement_fingerprint(
+            "SELECT * FROM tasks WHERE id IN ($1, $2)"
+        ) == get_statement_fingerprint(
+            "SELECT * FROM tasks WHERE id IN ($1, $2, $3, $4)"
+        )
+        assert get_statement_fingerprint("SELECT 1") != get_statement_fingerprint("SELECT * FROM tasks")
+
+    async def test_queries_are_logged(self, caplog):
+        engine = create_async_engine("sqlite+aiosqlite://")
+        QueryLogger(sample_rate=1, slow_query_ms=None).install(engine.sync_engine)
+        with caplog.at_level(logging.INFO, logger="taskapi.sql"):
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        await engine.dispose()
+
+        records = [record for record in caplog.records if record.name == "taskapi.sql"]
+        assert len(records) == 1
+        record = records[0]
+        assert record.levelno == logging.INFO
+        assert record.sql_fingerprint == get_statement_fingerprint("SELECT 1")
+        assert record.sql_duration_ms >= 0
+        assert record.sql_statement == "SELECT ?"
+        assert record.sql_slow is False
+
+    async def test_sampling_and_slow_queries(self, caplog):
+        """
+        Test sampled out queries are skipped, but slow ones are always logged
+        """
+        engine = create_async_engine("sqlite+aiosqlite://")
+        query_logger = QueryLogger(sample_rate=0, slow_query_ms=None)
+        query_logger.install(engine.sync_engine)
+        with caplog.at_level(logging.INFO, logger="taskapi.sql"):
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+                assert not [record for record in caplog.records if record.name == "taskapi.sql"]
+
+                query_logger.slow_query_ms = 0
+                await connection.execute(text("SELECT 1"))
+        await engine.dispose()
+
+        records = [record for record in caplog.records if record.name == "taskapi.sql"]
+        assert len(records) == 1
+        assert records[0].levelno == logging.WARNING
+        assert records[0].sql_slow is True
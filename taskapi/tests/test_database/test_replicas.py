@@ -0,0 +1,158 @@
+import time
+
+from sqlalchemy import text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.datastructures import State
+
+from api.middleware import ReadYourWritesMiddleware
+from db.models import User
+from db.replicas import (
+    Replica,
+    ReplicaSet,
+    LAST_WRITE_COOKIE,
+    LEAST_CONNECTIONS,
+    is_recent_write,
+    open_read_session,
+    track_writes,
+)
+from tests.conftest import TEST_DATABASE_URL
+
+UNAVAILABLE_DATABASE_URL = "sqlite+aiosqlite:///unknown_directory/replica.db"
+
+
+def make_replica(url: str = TEST_DATABASE_URL) -> Replica:
+    # the same pool as used by SessionManager, it counts checked out connections
+    return Replica(create_async_engine(url, poolclass=AsyncAdaptedQueuePool))
+
+
+class TestReplicaSet:
+    def test_round_robin(self):
+        replicas = [make_replica(), make_replica()]
+        replica_set = ReplicaSet(replicas)
+
+        assert [replica_set.choose() for _ in range(4)] == [*replicas, *replicas]
+
+    async def test_least_connections(self, init_db):
+        replicas = [make_replica(), make_replica()]
+        replica_set = ReplicaSet(replicas, strategy=LEAST_CONNECTIONS)
+
+        async with replicas[0].engine.connect():
+            assert replica_set.choose() is replicas[1]
+        await replica_set.dispose()
+
+    def test_unhealthy_replica_is_skipped(self):
+        replicas = [make_replica(), make_replica()]
+        replica_set = ReplicaSet(replicas, retry_seconds=60)
+        replica_set.mark_unhealthy(replicas[0])
+
+        assert [replica_set.choose() for _ in range(2)] == [replicas[1], replicas[1]]
+
+        replica_set.mark_unhealthy(replicas[1])
+        assert replica_set.choose() is None
+
+    def test_unhealthy_replica_is_retried(self):
+        replica = make_replica()
+        replica_set = ReplicaSet([replica], retry_seconds=0)
+        replica_set.mark_unhealthy(replica)
+
+        assert replica_set.choose() is replica
+
+
+class TestOpenReadSession:
+    async def test_replica_is_used(self, init_db):
+        replica = make_replica()
+        replica_set = ReplicaSet([replica])
+        primary_session_maker = async_sessionmaker(create_async_engine(UNAVAILABLE_DATABASE_URL))
+
+        async with await open_read_session(primary_session_maker, replica_set) as session:
+            assert session.bind is replica.engine
+            assert await session.scalar(text("SELECT 1")) == 1
+        await replica_set.dispose()
+
+    async def test_fallback_to_primary(self, init_db):
+        replica = make_replica(UNAVAILABLE_DATABASE_URL)
+        replica_set = ReplicaSet([replica], retry_seconds=60)
+        primary_engine = create_async_engine(TEST_DATABASE_URL)
+
+        async with await open_read_session(async_sessionmaker(primary_engine), replica_set) as session:
+            assert session.bind is primary_engine
+            assert await session.scalar(text("SELECT 1")) == 1
+        assert not replica.healthy
+        await primary_engine.dispose()
+
+    async def test_primary_is_used_after_write(self, init_db):
+        replica_set = ReplicaSet([make_replica()])
+        primary_engine = create_async_engine(TEST_DATABASE_URL)
+
+        session = await open_read_session(async_sessionmaker(primary_engine), replica_set, use_primary=True)
+        assert session.bind is primary_engine
+        await session.close()
+        await primary_engine.dispose()
+
+
+class TestTrackWrites:
+    async def test_committed_write(self, session, user):
+        state = State()
+        track_writes(session, state)
+        await session.execute(update(User).where(User.id == user.id).values(token_version=User.token_version))
+        await session.commit()
+
+        assert time.time() - state.last_write_at < 60
+
+    async def test_read_only_commit(self, session):
+        state = State()
+        track_writes(session, state)
+        await session.execute(text("SELECT 1"))
+        await session.commit()
+
+        assert not hasattr(state, "last_write_at")
+
+    async def test_rolled_back_write(self, session, user):
+        user_id = user.id
+        state = State()
+        track_writes(session, state)
+        await session.execute(update(User).where(User.id == user_id).values(token_version=User.token_version))
+        await session.rollback()
+        await session.commit()
+
+        assert not hasattr(state, "last_write_at")
+
+
+class TestIsRecentWrite:
+    def test_recent_write(self):
+        assert is_recent_write(str(time.time()), window_seconds=60)
+
+    def test_old_write(self):
+        assert not is_recent_write(str(time.time() - 120), window_seconds=60)
+
+    def test_no_or_invalid_cookie(self):
+        assert not is_recent_write(None, window_seconds=60)
+        assert not is_recent_write("invalid", window_seconds=60)
+
+
+class TestReadYourWritesMiddleware:
+    @staticmethod
+    async def call(state: dict) -> list:
+        """ Call middleware and return response headers """
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        await ReadYourWritesMiddleware(app)({"type": "http", "state": state}, None, send)
+        return messages[0]["headers"]
+
+    async def test_cookie_is_set_after_write(self):
+        headers = await self.call({"last_write_at": 1700000000.5})
+
+        assert len(headers) == 1
+        name, value = headers[0]
+        assert name == b"set-cookie"
+        assert value.startswith(f"{LAST_WRITE_COOKIE}=1700000000.500;".encode())
+
+    async def test_no_cookie_without_write(self):
+        assert await self.call({}) == []
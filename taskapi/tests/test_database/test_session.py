@@ -0,0 +1,27 @@
+from db.session import SessionManager
+
+
+class TestSessionManager:
+    async def test_engine_is_reused(self):
+        """
+        Test engine and session maker are created once, not on every call
+        """
+        engine = SessionManager().engine
+        session_maker = SessionManager().get_session_maker()
+
+        assert engine is not None
+        assert SessionManager().engine is engine
+        assert SessionManager().get_session_maker() is session_maker
+
+    async def test_dispose(self):
+        """
+        Test engine is dropped after dispose and recreated on next use
+        """
+        session_manager = SessionManager()
+        old_engine = session_manager.engine
+
+        await session_manager.dispose()
+        assert session_manager.engine is None
+
+        assert SessionManager().engine is not None
+        assert SessionManager().engine is not old_engine
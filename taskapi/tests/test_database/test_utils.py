@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+from db.utils import (
+    PasswordHasher,
+    PASSWORD_HASH_ALGORITHM,
+    generate_password_hash,
+    check_password_hash,
+    password_hash_needs_rehash,
+    generate_password_hash_async,
+    check_password_hash_async,
+    _generate_legacy_password_hash,
+)
+
+
+class TestPasswordHash:
+    def test_hash_format(self):
+        """
+        Test hash is self-describing and fits into users.password_hash column
+        """
+        password_hash = generate_password_hash("password", iterations=1000)
+
+        algorithm, iterations, salt, _ = password_hash.split("$")
+        assert algorithm == PASSWORD_HASH_ALGORITHM
+        assert iterations == "1000"
+        assert len(password_hash) <= 128
+
+    def test_hash_is_salted(self):
+        """
+        Test the same password gives different hashes
+        """
+        password_hash_1 = generate_password_hash("password")
+        password_hash_2 = generate_password_hash("password")
+
+        assert password_hash_1 != password_hash_2
+        assert check_password_hash("password", password_hash_1)
+        assert check_password_hash("password", password_hash_2)
+
+    def test_check_password_hash(self):
+        password_hash = generate_password_hash("password", iterations=1000)
+
+        assert check_password_hash("password", password_hash)
+        assert not check_password_hash("incorrect_password", password_hash)
+        assert not check_password_hash("password", "broken$hash")
+
+    def test_check_legacy_password_hash(self):
+        legacy_password_hash = _generate_legacy_password_hash("password")
+
+        assert check_password_hash("password", legacy_password_hash)
+        assert not check_password_hash("incorrect_password", legacy_password_hash)
+
+    def test_needs_rehash(self):
+        assert not password_hash_needs_rehash(generate_password_hash("password"))
+        assert password_hash_needs_rehash(generate_password_hash("password", iterations=1000))
+        assert password_hash_needs_rehash(_generate_legacy_password_hash("password"))
+
+
+class TestPasswordHasher:
+    async def test_hash_async(self):
+        """
+        Test async hashing and checking
+        """
+        password_hash = await generate_password_hash_async("password")
+
+        assert check_password_hash("password", password_hash)
+        assert await check_password_hash_async("password", password_hash)
+        assert not await check_password_hash_async("incorrect_password", password_hash)
+
+    async def test_concurrency_limit(self):
+        """
+        Test jobs over max_concurrency wait in queue and all of them are completed
+        """
+        password_hasher = PasswordHasher()
+        completed = password_hasher.completed
+        number_of_jobs = password_hasher.max_concurrency * 2
+
+        max_in_flight = 0
+        max_running = 0
+
+        def _job():
+            nonlocal max_in_flight, max_running
+            max_in_flight = max(max_in_flight, password_hasher.in_flight)
+            max_running = max(max_running, password_hasher.running)
+            time.sleep(0.001)
+
+        await asyncio.gather(*[password_hasher.run(_job) for _ in range(number_of_jobs)])
+
+        assert max_in_flight <= password_hasher.max_concurrency
+        assert 1 <= max_running <= password_hasher.workers
+        assert password_hasher.completed == completed + number_of_jobs
+        assert password_hasher.waiting == 0
+        assert password_hasher.in_flight == 0
+        assert password_hasher.running == 0
@@ -4,8 +4,17 @@ from fastapi import status
 
 from api.v1.endpoints.auth.config import TOKEN_URL
 from api.v1.endpoints.auth.schemas import UserData, Token, RegistrationData
-from api.v1.endpoints.auth.utils import decode_token
+from api.v1.endpoints.auth.utils import (
+    decode_token,
+    create_access_token,
+    create_user_access_token,
+    get_authorization_headers,
+    invalidate_token_version,
+    invalidate_user_tokens,
+    token_cache,
+)
 from db.models import User
+from db.utils import _generate_legacy_password_hash
 from tests.test_endpoints.utils import is_user_exist
 
 URL_BASE = "/api/v1/auth"
@@ -41,6 +50,27 @@ class TestToken:
         payload = decode_token(token.access_token)
         assert "email" in payload
         assert payload.get("email") == user.email
+        assert payload.get("sub") == str(user.id)
+        assert payload.get("ver") == user.token_version
+
+    async def test_get_token_upgrades_legacy_hash(self, session, client, user, raw_password):
+        """
+        Test password hash of legacy format is upgraded after successful login
+        """
+        user.password_hash = _generate_legacy_password_hash(raw_password)
+        await session.commit()
+        assert user.password_needs_rehash()
+
+        user_data = UserData(
+            email=user.email,
+            password=raw_password,
+        )
+        response = await client.post(self.get_url(), json=user_data.model_dump())
+        assert response.status_code == status.HTTP_200_OK
+
+        await session.refresh(user)
+        assert not user.password_needs_rehash()
+        assert user.check_password(raw_password)
 
     async def test_incorrect_login(self, client, user, raw_password):
         """
@@ -124,3 +154,75 @@ class TestSignup:
             json=reg_data.model_dump()
         )
         assert response.status_code == status.HTTP_409_CONFLICT
+
+
+class TestCurrentUser:
+    """
+    Test authorization of protected endpoints by access token.
+    GET /api/v1/tasks/ is used as protected endpoint.
+    """
+    url = "/api/v1/tasks/"
+
+    async def test_valid_token(self, client, user):
+        headers = get_authorization_headers(create_user_access_token(user))
+
+        response = await client.get(self.url, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+    async def test_token_without_user_id(self, client, user):
+        """
+        Test token with email claim only is still accepted
+        """
+        headers = get_authorization_headers(create_access_token({"email": user.email}))
+
+        response = await client.get(self.url, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+    async def test_revoked_token(self, session, client, user):
+        """
+        Test token is rejected after the password is changed
+        """
+        headers = get_authorization_headers(create_user_access_token(user))
+        response = await client.get(self.url, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+
+        user.set_password(str(uuid4()))
+        await session.commit()
+        invalidate_token_version(user.id)
+
+        response = await client.get(self.url, headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_token_is_cached(self, client, user):
+        """
+        Test token is decoded once and then taken from cache
+        """
+        headers = get_authorization_headers(create_user_access_token(user))
+
+        hits = token_cache.hits
+        for _ in range(3):
+            response = await client.get(self.url, headers=headers)
+            assert response.status_code == status.HTTP_200_OK
+        assert token_cache.hits == hits + 2
+
+        invalidate_user_tokens(user.id)
+        assert len(token_cache) == 0
+
+    async def test_deleted_user(self, session, client, user):
+        """
+        Test token is rejected after the user is deleted
+        """
+        headers = get_authorization_headers(create_user_access_token(user))
+
+        await session.delete(user)
+        await session.commit()
+        invalidate_token_version(user.id)
+
+        response = await client.get(self.url, headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_invalid_token(self, client):
+        headers = get_authorization_headers("invalid_token")
+
+        response = await client.get(self.url, headers=headers)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -1,3 +1,6 @@
+from metrics import metrics, render_metrics
+
+
 class TestPingApp:
     url = "api/v1/health/ping_app"
 
@@ -12,3 +15,78 @@ class TestPingDb:
     async def test_test_db(self, client):
         response = await client.get(self.url)
         assert response.status_code == 200
+
+
+class TestDbPool:
+    url = "api/v1/health/db_pool"
+
+    async def test_db_pool(self, client):
+        response = await client.get(self.url)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["checked_out"] == 0
+        assert "size" in data
+
+
+class TestDbReplicas:
+    url = "api/v1/health/db_replicas"
+
+    async def test_no_replicas(self, client):
+        response = await client.get(self.url)
+        assert response.status_code == 200
+        assert response.json() == []
+
+
+class TestPasswordHasher:
+    url = "api/v1/health/password_hasher"
+
+    async def test_password_hasher(self, client):
+        response = await client.get(self.url)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert data["waiting"] == 0
+        assert data["in_flight"] == 0
+        assert data["queued"] == data["running"] == 0
+
+
+class TestAuthCache:
+    url = "api/v1/health/auth_cache"
+
+    async def test_auth_cache(self, client):
+        response = await client.get(self.url)
+        assert response.status_code == 200
+
+        data = response.json()
+        assert "hits" in data["tokens"]
+        assert "misses" in data["token_versions"]
+
+
+class TestMetrics:
+    url = "api/v1/health/metrics"
+
+    async def test_metrics(self, auth_client, task):
+        metrics.reset()
+        response = await auth_client.get(f"api/v1/tasks/{task.id}")
+        assert response.status_code == 200
+
+        response = await auth_client.get(self.url)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+
+        text = response.text
+        assert "http_requests_in_flight 1" in text
+        # route template is used as label instead of actual path
+        labels = 'method="GET",route="/api/v1/tasks/{task_id:int}"'
+        assert f'http_request_duration_seconds_count{{{labels},status="200"}} 1' in text
+        assert f'http_request_db_queries_count{{{labels}}} 1' in text
+        assert f'http_request_db_queries_bucket{{{labels},le="0"}} 0' in text
+        assert "db_pool_connections" in text
+
+    async def test_unmatched_route(self, client):
+        metrics.reset()
+        await client.get("api/v1/unknown")
+
+        text = render_metrics(metrics)
+        assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"} 1' in text
@@ -1,6 +1,37 @@
+import csv
+import datetime as dt
+import io
+import json
+import time
+from uuid import uuid4
+
+import pytest
 from fastapi import status
-
-from api.v1.endpoints.tasks.schemas import AddNewTask, Task as TaskSchema, TasksList, UpdateTask, Task
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+
+from api.v1.endpoints.tasks import utils as tasks_utils
+from api.v1.endpoints.tasks.config import (
+    MAX_BATCH_SIZE,
+    MAX_CSV_RECORD_LINES,
+    SYNC_TOKEN_MAX_AGE_DAYS,
+    TOMBSTONE_RETENTION_DAYS,
+)
+from api.v1.endpoints.tasks.utils import encode_sync_token, get_tasks_version
+from events import TaskEventType
+from db.models import Task as TaskModel, TaskTombstone
+from api.v1.endpoints.tasks.schemas import (
+    AddNewTask,
+    Task as TaskSchema,
+    TasksPage,
+    UpdateTask,
+    Task,
+    BatchResult,
+    BatchItemStatus,
+    ImportResult,
+    TaskStats,
+    TaskChanges,
+)
 
 from .utils import (
     add_task_to_database,
@@ -94,8 +125,10 @@ class TestGetTasks:
 
         # Extract tasks data from response
         data = response.json()
-        tasks_response_data = TasksList.model_validate(data).root
+        tasks_page = TasksPage.model_validate(data)
+        tasks_response_data = tasks_page.items
         assert len(tasks_response_data) == self.NUMBER_OF_TASKS
+        assert tasks_page.next_cursor is None
 
         # Prepare data
         tasks_sorting_func = lambda task: task.id
@@ -119,9 +152,85 @@ class TestGetTasks:
 
         # Check still no tasks presented
         data = response.json()
-        tasks_response_data = TasksList.model_validate(data).root
+        tasks_response_data = TasksPage.model_validate(data).items
         assert len(tasks_response_data) == 0
 
+    async def test_get_all_tasks_pagination(self, session, user, auth_client, task_factory):
+        """
+        Test walking through all user's tasks page by page.
+        """
+        tasks = [task_factory() for _ in range(5)]
+        await add_tasks_to_database(session, tasks, user_id=user.id)
+
+        received_ids = []
+        params = {"limit": 2}
+        while True:
+            response = await auth_client.get(self.get_url(), params=params)
+            assert response.status_code == status.HTTP_200_OK
+
+            tasks_page = TasksPage.model_validate(response.json())
+            assert len(tasks_page.items) <= 2
+            received_ids.extend(task.id for task in tasks_page.items)
+            if tasks_page.next_cursor is None:
+                break
+            params["cursor"] = tasks_page.next_cursor
+
+        assert received_ids == sorted(task.id for task in tasks)
+
+    async def test_get_all_tasks_order_by_created_at(self, session, user, auth_client, task_factory):
+        """
+        Test pagination ordered by created_at descending, ties are ordered by id.
+        """
+        created_at = dt.datetime(2023, 7, 1, 12, 0, 0, 1)
+        tasks = [task_factory() for _ in range(4)]
+        tasks[0].created_at = created_at
+        tasks[1].created_at = created_at + dt.timedelta(days=1)
+        tasks[2].created_at = created_at
+        tasks[3].created_at = created_at - dt.timedelta(days=1)
+        await add_tasks_to_database(session, tasks, user_id=user.id)
+
+        received_ids = []
+        params = {"limit": 1, "order_by": "created_at", "order": "desc"}
+        while True:
+            response = await auth_client.get(self.get_url(), params=params)
+            assert response.status_code == status.HTTP_200_OK
+
+            tasks_page = TasksPage.model_validate(response.json())
+            received_ids.extend(task.id for task in tasks_page.items)
+            if tasks_page.next_cursor is None:
+                break
+            params["cursor"] = tasks_page.next_cursor
+
+        assert received_ids == [tasks[1].id, tasks[2].id, tasks[0].id, tasks[3].id]
+
+    async def test_get_all_tasks_filter_is_done(self, session, user, auth_client, task_factory):
+        """
+        Test filtering tasks by is_done.
+        """
+        tasks = [task_factory() for _ in range(3)]
+        tasks[0].is_done = True
+        await add_tasks_to_database(session, tasks, user_id=user.id)
+
+        response = await auth_client.get(self.get_url(), params={"is_done": True})
+        assert response.status_code == status.HTTP_200_OK
+
+        tasks_response_data = TasksPage.model_validate(response.json()).items
+        assert [task.id for task in tasks_response_data] == [tasks[0].id]
+
+    async def test_get_all_tasks_invalid_cursor(self, auth_client):
+        """
+        Test getting tasks with broken cursor.
+        """
+        response = await auth_client.get(self.get_url(), params={"cursor": "broken"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_get_all_tasks_limit_too_big(self, auth_client):
+        """
+        Test getting tasks with limit over the maximum page size.
+        """
+        response = await auth_client.get(self.get_url(), params={"limit": 100000})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
     async def test_get_all_tasks_not_authenticated(self, client):
         """
         Test getting tasks when you are not authorized.
@@ -161,11 +270,55 @@ class TestAddTask:
         # Make post request to add the task
         task_request_data = self.make_task_request_data(task)
         response = await auth_client.post(self.get_url(), json=task_request_data.model_dump())
-        assert response.status_code == status.HTTP_200_OK
+        assert response.status_code == status.HTTP_201_CREATED
 
         # Check task exist after request
         assert await is_task_exist(session, task)
 
+        # Check created task is returned
+        task_response_data = TaskSchema(**response.json())
+        assert task_response_data.title == task.title
+        assert response.headers["Location"].endswith(f"{URL_BASE}{task_response_data.id}")
+
+        response = await auth_client.get(response.headers["Location"])
+        assert response.status_code == status.HTTP_200_OK
+        assert TaskSchema(**response.json()) == task_response_data
+
+    async def test_add_task_idempotency_key(self, session, user, auth_client, task_factory):
+        """
+        Test retried request with the same idempotency key doesn't create another task.
+        """
+        user_id = user.id  # user is expired after rollback of the conflicting insert
+        task = task_factory()
+        task_request_data = self.make_task_request_data(task)
+        headers = {"Idempotency-Key": str(uuid4())}
+
+        responses = [
+            await auth_client.post(self.get_url(), json=task_request_data.model_dump(), headers=headers)
+            for _ in range(2)
+        ]
+        assert [response.status_code for response in responses] == [status.HTTP_201_CREATED] * 2
+        assert responses[0].json() == responses[1].json()
+
+        stmt = select(func.count()).select_from(TaskModel).where(TaskModel.user_id == user_id)
+        assert await session.scalar(stmt) == 1
+
+    async def test_add_task_other_integrity_error(self, auth_client, broker, task_factory):
+        """
+        Test violation of another constraint isn't treated as a retried request with idempotency key.
+        """
+        async def publish(session, event):
+            raise IntegrityError("INSERT", {}, Exception("constraint violation"))
+
+        broker.publish = publish
+        task_request_data = self.make_task_request_data(task_factory())
+        with pytest.raises(IntegrityError):
+            await auth_client.post(
+                self.get_url(),
+                json=task_request_data.model_dump(),
+                headers={"Idempotency-Key": str(uuid4())},
+            )
+
     async def test_add_task_not_authenticated(self, client, task_factory):
         """
         Test adding task when user is not authenticated
@@ -219,6 +372,10 @@ class TestTaskUpdate:
         assert task.description == new_task_data.description
         assert task.is_done == new_task_data.is_done
 
+        # Check updated task is returned
+        task_response_data = TaskSchema(**response.json())
+        assert task_response_data == TaskSchema.model_validate(task, from_attributes=True)
+
     async def test_update_task_one_field(self, session, task, auth_client):
         """
         Test successful update of only one task's field
@@ -360,3 +517,746 @@ class TestDeleteTask:
 
         # Check task still exists
         assert await is_task_exist(session, task)
+
+
+class TestConditionalRequests:
+    """
+    Test ETag / Last-Modified of tasks:
+    304 for If-None-Match / If-Modified-Since and 412 for stale If-Match.
+    """
+
+    @staticmethod
+    def get_url(task_id: int) -> str:
+        return f"{URL_BASE}{task_id}"
+
+    @staticmethod
+    async def add_old_task(session, user, task_factory) -> int:
+        """ Task changed long ago, so any update gives it a new ETag """
+        task = task_factory()
+        task.updated_at = dt.datetime.utcnow() - dt.timedelta(hours=1, microseconds=1)
+        await add_task_to_database(session, task, user_id=user.id)
+        return task.id
+
+    async def test_get_task_not_modified(self, task, auth_client):
+        response = await auth_client.get(self.get_url(task.id))
+        assert response.status_code == status.HTTP_200_OK
+        etag = response.headers["ETag"]
+        last_modified = response.headers["Last-Modified"]
+        assert response.headers["Cache-Control"] == "private, no-cache"
+
+        for headers in (
+                {"If-None-Match": etag},
+                {"If-None-Match": f'"another", W/{etag}'},
+                {"If-Modified-Since": last_modified},
+        ):
+            response = await auth_client.get(self.get_url(task.id), headers=headers)
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.content == b""
+            assert response.headers["ETag"] == etag
+
+        # If-Modified-Since is ignored with If-None-Match
+        response = await auth_client.get(
+            self.get_url(task.id),
+            headers={"If-None-Match": '"another"', "If-Modified-Since": last_modified},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert TaskSchema(**response.json()).id == task.id
+
+    async def test_list_not_modified_until_change(self, auth_client):
+        await auth_client.post(URL_BASE, json={"title": "title_1"})
+        response = await auth_client.get(URL_BASE)
+        etag = response.headers["ETag"]
+
+        response = await auth_client.get(URL_BASE, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # another page has another ETag
+        response = await auth_client.get(URL_BASE, params={"limit": 1}, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+
+        await auth_client.post(URL_BASE, json={"title": "title_2"})
+        response = await auth_client.get(URL_BASE, headers={"If-None-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] != etag
+        assert len(response.json()["items"]) == 2
+
+    async def test_update_if_match(self, session, user, auth_client, task_factory):
+        task_id = await self.add_old_task(session, user, task_factory)
+        etag = (await auth_client.get(self.get_url(task_id))).headers["ETag"]
+
+        response = await auth_client.put(self.get_url(task_id), json={"title": "new"}, headers={"If-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+        new_etag = response.headers["ETag"]
+        assert new_etag != etag
+
+        # the task was changed after etag was got
+        response = await auth_client.put(self.get_url(task_id), json={"title": "lost"}, headers={"If-Match": etag})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        response = await auth_client.get(self.get_url(task_id), headers={"If-None-Match": new_etag})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        # weak ETags never match
+        response = await auth_client.put(
+            self.get_url(task_id), json={"title": "weak"}, headers={"If-Match": f"W/{new_etag}"}
+        )
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+        response = await auth_client.put(self.get_url(task_id), json={"title": "any"}, headers={"If-Match": "*"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["title"] == "any"
+
+    async def test_delete_if_match(self, session, user, auth_client, task_factory):
+        task_id = await self.add_old_task(session, user, task_factory)
+        etag = (await auth_client.get(self.get_url(task_id))).headers["ETag"]
+        await auth_client.put(self.get_url(task_id), json={"is_done": True})
+
+        response = await auth_client.delete(self.get_url(task_id), headers={"If-Match": etag})
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+        etag = (await auth_client.get(self.get_url(task_id))).headers["ETag"]
+        response = await auth_client.delete(self.get_url(task_id), headers={"If-Match": etag})
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await auth_client.delete(self.get_url(task_id), headers={"If-Match": "*"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestBatchAddTasks:
+    """
+    Test POST /api/v1/tasks/batch
+    Add many tasks of current user at once.
+    Authenticated user only.
+    """
+
+    @staticmethod
+    def get_url() -> str:
+        return f"{URL_BASE}batch"
+
+    async def test_add_tasks(self, session, auth_client, task_factory):
+        """
+        Test successful adding of tasks.
+        """
+        tasks = [task_factory() for _ in range(3)]
+        items = [TestAddTask.make_task_request_data(task).model_dump() for task in tasks]
+
+        response = await auth_client.post(self.get_url(), json={"items": items})
+        assert response.status_code == status.HTTP_200_OK
+
+        # Check tasks are returned in the same order
+        result = BatchResult.model_validate(response.json())
+        assert [item.status for item in result.items] == [BatchItemStatus.created] * 3
+        assert [item.task.title for item in result.items] == [task.title for task in tasks]
+        for task in tasks:
+            assert await is_task_exist(session, task)
+
+    async def test_add_tasks_too_many(self, auth_client, task_factory):
+        """
+        Test adding more tasks than allowed in one batch.
+        """
+        item = TestAddTask.make_task_request_data(task_factory()).model_dump()
+
+        response = await auth_client.post(self.get_url(), json={"items": [item] * (MAX_BATCH_SIZE + 1)})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    async def test_add_tasks_not_authenticated(self, client, task_factory):
+        item = TestAddTask.make_task_request_data(task_factory()).model_dump()
+
+        response = await client.post(self.get_url(), json={"items": [item]})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestBatchUpdateTasks:
+    """
+    Test PUT /api/v1/tasks/batch
+    Apply the same changes to many tasks of current user.
+    Authenticated user only.
+    """
+
+    @staticmethod
+    def get_url() -> str:
+        return f"{URL_BASE}batch"
+
+    async def test_update_tasks(self, session, user, auth_client, task_factory):
+        """
+        Test successful update of tasks, not found tasks are reported.
+        """
+        tasks = [task_factory() for _ in range(2)]
+        await add_tasks_to_database(session, tasks, user_id=user.id)
+        unknown_task_id = await get_not_existing_task_id(session)
+
+        ids = [tasks[0].id, unknown_task_id, tasks[1].id]
+        response = await auth_client.put(
+            self.get_url(),
+            json={"ids": ids, "changes": {"is_done": True}},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        result = BatchResult.model_validate(response.json())
+        assert [item.id for item in result.items] == ids
+        assert [item.status for item in result.items] == [
+            BatchItemStatus.updated, BatchItemStatus.not_found, BatchItemStatus.updated,
+        ]
+        assert result.items[0].task.is_done
+
+        for task in tasks:
+            await session.refresh(task)
+            assert task.is_done
+
+    async def test_update_tasks_atomic(self, session, user, auth_client, task_factory, user_factory):
+        """
+        Test nothing is updated in atomic mode when one of the tasks is not accessible.
+        """
+        another_user = await user_factory()
+        task = task_factory()
+        another_user_task = task_factory()
+        await add_task_to_database(session, task, user_id=user.id)
+        await add_task_to_database(session, another_user_task, user_id=another_user.id)
+
+        response = await auth_client.put(
+            self.get_url(),
+            json={"ids": [task.id, another_user_task.id], "changes": {"is_done": True}, "atomic": True},
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        for task in [task, another_user_task]:
+            await session.refresh(task)
+            assert not task.is_done
+
+    async def test_update_tasks_nothing_found(self, session, user, auth_client):
+        """
+        Test tasks version is not advanced when no task is updated.
+        """
+        version, _ = await get_tasks_version(session, user.id)
+        unknown_task_id = await get_not_existing_task_id(session)
+
+        response = await auth_client.put(
+            self.get_url(),
+            json={"ids": [unknown_task_id], "changes": {"is_done": True}},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert (await get_tasks_version(session, user.id))[0] == version
+
+    async def test_update_tasks_no_changes(self, task, auth_client):
+        response = await auth_client.put(self.get_url(), json={"ids": [task.id], "changes": {}})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestBatchDeleteTasks:
+    """
+    Test DELETE /api/v1/tasks/batch
+    Delete many tasks of current user.
+    Authenticated user only.
+    """
+
+    @staticmethod
+    def get_url() -> str:
+        return f"{URL_BASE}batch"
+
+    async def test_delete_tasks(self, session, user, auth_client, task_factory):
+        """
+        Test successful deleting of tasks, not found tasks are reported.
+        """
+        tasks = [task_factory() for _ in range(2)]
+        await add_tasks_to_database(session, tasks, user_id=user.id)
+        unknown_task_id = await get_not_existing_task_id(session)
+
+        ids = [tasks[0].id, tasks[1].id, unknown_task_id]
+        response = await auth_client.request("DELETE", self.get_url(), json={"ids": ids})
+        assert response.status_code == status.HTTP_200_OK
+
+        result = BatchResult.model_validate(response.json())
+        assert [item.status for item in result.items] == [
+            BatchItemStatus.deleted, BatchItemStatus.deleted, BatchItemStatus.not_found,
+        ]
+        for task in tasks:
+            assert not await is_task_exist(session, task)
+
+    async def test_delete_tasks_atomic(self, session, user, auth_client, task_factory, user_factory):
+        """
+        Test nothing is deleted in atomic mode when one of the tasks is not accessible.
+        """
+        another_user = await user_factory()
+        task = task_factory()
+        another_user_task = task_factory()
+        await add_task_to_database(session, task, user_id=user.id)
+        await add_task_to_database(session, another_user_task, user_id=another_user.id)
+
+        response = await auth_client.request(
+            "DELETE",
+            self.get_url(),
+            json={"ids": [task.id, another_user_task.id], "atomic": True},
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        # tasks are expired after rollback, refresh fails if they have been deleted
+        await session.refresh(task)
+        await session.refresh(another_user_task)
+        assert await is_task_exist(session, task)
+        assert await is_task_exist(session, another_user_task)
+
+    async def test_delete_tasks_nothing_found(self, session, user, auth_client):
+        """
+        Test tasks version is not advanced when no task is deleted.
+        """
+        version, _ = await get_tasks_version(session, user.id)
+        unknown_task_id = await get_not_existing_task_id(session)
+
+        response = await auth_client.request("DELETE", self.get_url(), json={"ids": [unknown_task_id]})
+        assert response.status_code == status.HTTP_200_OK
+        assert (await get_tasks_version(session, user.id))[0] == version
+
+
+class TestExportTasks:
+    """
+    Test GET /api/v1/tasks/export
+    Stream all tasks of current user as NDJSON or CSV.
+    Authenticated user only.
+    """
+
+    @staticmethod
+    def get_url() -> str:
+        return f"{URL_BASE}export"
+
+    async def test_export_ndjson(self, session, user, auth_client, task_factory):
+        tasks = [task_factory() for _ in range(3)]
+        await add_tasks_to_database(session, tasks, user_id=user.id)
+
+        response = await auth_client.get(self.get_url())
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        exported_tasks = [TaskSchema(**json.loads(line)) for line in response.text.splitlines()]
+        assert exported_tasks == [TaskSchema.model_validate(task, from_attributes=True) for task in tasks]
+
+    async def test_export_csv(self, session, user, auth_client, task_factory):
+        tasks = [task_factory() for _ in range(3)]
+        await add_tasks_to_database(session, tasks, user_id=user.id)
+
+        response = await auth_client.get(self.get_url(), params={"format": "csv"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/csv")
+
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert [int(row["id"]) for row in rows] == [task.id for task in tasks]
+        assert [row["title"] for row in rows] == [task.title for task in tasks]
+
+    async def test_export_filters(self, session, user, auth_client, task_factory):
+        tasks = [task_factory() for _ in range(3)]
+        tasks[1].is_done = True
+        await add_tasks_to_database(session, tasks, user_id=user.id)
+
+        response = await auth_client.get(self.get_url(), params={"is_done": True})
+        assert response.status_code == status.HTTP_200_OK
+
+        exported_ids = [json.loads(line)["id"] for line in response.text.splitlines()]
+        assert exported_ids == [tasks[1].id]
+
+    async def test_export_not_authenticated(self, client):
+        response = await client.get(self.get_url())
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestImportTasks:
+    """
+    Test POST /api/v1/tasks/import
+    Add tasks of current user from NDJSON or CSV body.
+    Authenticated user only.
+    """
+
+    @staticmethod
+    def get_url() -> str:
+        return f"{URL_BASE}import"
+
+    @staticmethod
+    async def get_user_tasks(session, user_id: int) -> list[TaskModel]:
+        stmt = select(TaskModel).where(TaskModel.user_id == user_id).order_by(TaskModel.id)
+        return list(await session.scalars(stmt))
+
+    async def test_import_ndjson(self, session, user, auth_client):
+        """
+        Test valid lines are imported and invalid ones are reported.
+        """
+        user_id = user.id
+        body = "\n".join([
+            json.dumps({"title": "title_1", "description": "description_1"}),
+            "",
+            json.dumps({"title": "title_2", "is_done": True}),
+            "not a json",
+            json.dumps({"description": "no title"}),
+        ])
+
+        response = await auth_client.post(self.get_url(), content=body.encode())
+        assert response.status_code == status.HTTP_200_OK
+
+        result = ImportResult.model_validate(response.json())
+        assert result.imported == 2
+        assert result.failed == 2
+        assert [error.line for error in result.errors] == [4, 5]
+
+        tasks = await self.get_user_tasks(session, user_id)
+        assert [(task.title, task.is_done) for task in tasks] == [("title_1", False), ("title_2", True)]
+        assert all(task.created_at is not None for task in tasks)
+
+    async def test_import_csv(self, session, user, auth_client):
+        """
+        Test import of CSV, quoted values may contain line breaks.
+        """
+        user_id = user.id
+        body = (
+            "title,description,is_done\n"
+            "title_1,,false\n"
+            'title_2,"multi\nline, description",true\n'
+            "title_3,description_3,not_bool\n"
+        )
+
+        response = await auth_client.post(self.get_url(), params={"format": "csv"}, content=body.encode())
+        assert response.status_code == status.HTTP_200_OK
+
+        result = ImportResult.model_validate(response.json())
+        assert result.imported == 2
+        assert result.failed == 1
+        assert result.errors[0].line == 5
+
+        tasks = await self.get_user_tasks(session, user_id)
+        assert [task.description for task in tasks] == [None, "multi\nline, description"]
+
+    async def test_import_csv_unclosed_quote(self, session, user, auth_client):
+        """
+        Test record with unclosed quoted value is reported and import goes on after it.
+        """
+        user_id = user.id
+        body = (
+            "title,description\n"
+            'title_1,"unclosed\n'
+            + "\n" * MAX_CSV_RECORD_LINES
+            + "title_2,description_2\n"
+        )
+
+        response = await auth_client.post(self.get_url(), params={"format": "csv"}, content=body.encode())
+        assert response.status_code == status.HTTP_200_OK
+
+        result = ImportResult.model_validate(response.json())
+        assert result.failed == 1
+        assert result.errors[0].line == 2
+
+        tasks = await self.get_user_tasks(session, user_id)
+        assert [task.title for task in tasks] == ["title_2"]
+
+    async def test_import_csv_without_title(self, auth_client):
+        body = "description,is_done\ndescription_1,false\n"
+
+        response = await auth_client.post(self.get_url(), params={"format": "csv"}, content=body.encode())
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_import_not_authenticated(self, client):
+        response = await client.post(self.get_url(), content=b"{}")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestTaskStats:
+    """
+    Test GET /api/v1/tasks/stats
+    Get counts of current user's tasks.
+    Authenticated user only.
+    """
+
+    @staticmethod
+    def get_url() -> str:
+        return f"{URL_BASE}stats"
+
+    async def get_stats(self, auth_client, **params) -> TaskStats:
+        response = await auth_client.get(self.get_url(), params=params)
+        assert response.status_code == status.HTTP_200_OK
+        return TaskStats.model_validate(response.json())
+
+    async def test_no_tasks(self, auth_client):
+        stats = await self.get_stats(auth_client)
+        assert (stats.total, stats.done, stats.open, stats.created_in_window) == (0, 0, 0, 0)
+        assert stats.window_hours == 24
+
+    async def test_counters_follow_changes(self, auth_client):
+        """
+        Test counters are updated by every kind of change of tasks
+        """
+        response = await auth_client.post(URL_BASE, json={"title": "title_1"})
+        task_id = response.json()["id"]
+        await auth_client.post(f"{URL_BASE}batch", json={"items": [
+            {"title": "title_2", "is_done": True},
+            {"title": "title_3"},
+            {"title": "title_4"},
+        ]})
+        await auth_client.post(f"{URL_BASE}import", content=json.dumps({"title": "title_5", "is_done": True}))
+        stats = await self.get_stats(auth_client)
+        assert (stats.total, stats.done, stats.open) == (5, 2, 3)
+        assert stats.created_in_window == 5
+
+        # setting the same value doesn't change counters
+        await auth_client.put(f"{URL_BASE}{task_id}", json={"is_done": True})
+        await auth_client.put(f"{URL_BASE}{task_id}", json={"is_done": True})
+        stats = await self.get_stats(auth_client)
+        assert (stats.total, stats.done) == (5, 3)
+
+        response = await auth_client.get(URL_BASE)
+        ids = [task["id"] for task in response.json()["items"]]
+        await auth_client.put(f"{URL_BASE}batch", json={"ids": ids, "changes": {"is_done": False}})
+        stats = await self.get_stats(auth_client)
+        assert (stats.total, stats.done) == (5, 0)
+
+        await auth_client.put(f"{URL_BASE}batch", json={"ids": ids[:2], "changes": {"is_done": True}})
+        await auth_client.delete(f"{URL_BASE}{ids[0]}")
+        stats = await self.get_stats(auth_client)
+        assert (stats.total, stats.done) == (4, 1)
+
+        await auth_client.request("DELETE", f"{URL_BASE}batch", json={"ids": ids})
+        stats = await self.get_stats(auth_client)
+        assert (stats.total, stats.done, stats.open) == (0, 0, 0)
+
+    async def test_created_in_window(self, session, user, auth_client, task_factory):
+        old_task = task_factory()
+        old_task.created_at = dt.datetime.utcnow() - dt.timedelta(hours=30)
+        await add_task_to_database(session, old_task, user_id=user.id)
+        await add_task_to_database(session, task_factory(), user_id=user.id)
+
+        stats = await self.get_stats(auth_client)
+        assert stats.created_in_window == 1
+
+        stats = await self.get_stats(auth_client, window_hours=48)
+        assert stats.created_in_window == 2
+        assert stats.window_hours == 48
+
+    async def test_stats_not_authenticated(self, client):
+        response = await client.get(self.get_url())
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestTaskChanges:
+    """
+    Test GET /api/v1/tasks/changes
+    Get tasks changed since sync token.
+    Authenticated user only.
+    """
+
+    @staticmethod
+    def get_url() -> str:
+        return f"{URL_BASE}changes"
+
+    async def get_changes(self, auth_client, **params) -> TaskChanges:
+        response = await auth_client.get(self.get_url(), params=params)
+        assert response.status_code == status.HTTP_200_OK
+        return TaskChanges.model_validate(response.json())
+
+    async def test_changes(self, session, user, auth_client, task_factory, user_factory):
+        task = task_factory()  # task added before sync, by another version of the app
+        await add_task_to_database(session, task, user_id=user.id)
+        task_id = task.id
+        await add_task_to_database(session, task_factory(), user_id=(await user_factory()).id)
+        response = await auth_client.post(URL_BASE, json={"title": "title_1"})
+        created_id = response.json()["id"]
+
+        # initial sync
+        changes = await self.get_changes(auth_client)
+        assert [task.id for task in changes.updated] == [task_id, created_id]
+        assert changes.deleted == []
+        assert not changes.has_more
+
+        # nothing changed
+        sync_token = changes.sync_token
+        changes = await self.get_changes(auth_client, since=sync_token)
+        assert (changes.updated, changes.deleted) == ([], [])
+
+        await auth_client.put(f"{URL_BASE}{task_id}", json={"title": "updated"})
+        await auth_client.delete(f"{URL_BASE}{created_id}")
+        response = await auth_client.post(URL_BASE, json={"title": "title_2"})
+        new_id = response.json()["id"]
+
+        changes = await self.get_changes(auth_client, since=sync_token)
+        assert [(task.id, task.title) for task in changes.updated] == [(task_id, "updated"), (new_id, "title_2")]
+        assert changes.deleted == [created_id]
+
+        changes = await self.get_changes(auth_client, since=changes.sync_token)
+        assert (changes.updated, changes.deleted) == ([], [])
+
+    async def test_changes_pagination(self, auth_client):
+        changes = await self.get_changes(auth_client)
+        await auth_client.post(f"{URL_BASE}batch", json={"items": [
+            {"title": "title_1"},
+            {"title": "title_2"},
+            {"title": "title_3"},
+        ]})
+        response = await auth_client.get(URL_BASE)
+        ids = [task["id"] for task in response.json()["items"]]
+        await auth_client.request("DELETE", f"{URL_BASE}batch", json={"ids": ids[:2]})
+
+        changes = await self.get_changes(auth_client, since=changes.sync_token, limit=2)
+        assert [task.id for task in changes.updated] == ids[2:]
+        assert changes.deleted == ids[:1]
+        assert changes.has_more
+
+        changes = await self.get_changes(auth_client, since=changes.sync_token, limit=2)
+        assert (changes.updated, changes.deleted) == ([], ids[1:2])
+        assert not changes.has_more
+
+    async def test_old_tombstones_cleanup(self, session, user, auth_client, monkeypatch):
+        """
+        Test tombstones older than retention are removed by a sampled share of deletes.
+        """
+        user_id = user.id
+        old_tombstone = TaskTombstone(
+            user_id=user_id,
+            version=0,
+            task_id=0,
+            deleted_at=dt.datetime.utcnow() - dt.timedelta(days=TOMBSTONE_RETENTION_DAYS + 1),
+        )
+        session.add(old_tombstone)
+        await session.commit()
+        ids = []
+        for title in ["title_1", "title_2"]:
+            response = await auth_client.post(URL_BASE, json={"title": title})
+            ids.append(response.json()["id"])
+
+        async def get_tombstone_ids() -> list[int]:
+            stmt = (
+                select(TaskTombstone.task_id)
+                .where(TaskTombstone.user_id == user_id)
+                .order_by(TaskTombstone.task_id)
+            )
+            return list(await session.scalars(stmt))
+
+        monkeypatch.setattr(tasks_utils, "TOMBSTONE_CLEANUP_RATE", 0)
+        await auth_client.delete(f"{URL_BASE}{ids[0]}")
+        assert await get_tombstone_ids() == [0, ids[0]]
+
+        monkeypatch.setattr(tasks_utils, "TOMBSTONE_CLEANUP_RATE", 1)
+        await auth_client.delete(f"{URL_BASE}{ids[1]}")
+        assert await get_tombstone_ids() == ids
+
+    async def test_invalid_sync_token(self, auth_client):
+        response = await auth_client.get(self.get_url(), params={"since": "invalid"})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        issued_at = time.time() - SYNC_TOKEN_MAX_AGE_DAYS * 24 * 60 * 60 - 60
+        response = await auth_client.get(self.get_url(), params={"since": encode_sync_token(1, 1, issued_at)})
+        assert response.status_code == status.HTTP_410_GONE
+
+    async def test_changes_not_authenticated(self, client):
+        response = await client.get(self.get_url())
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestTaskEvents:
+    """
+    Test events of task changes published to the broker,
+    GET /api/v1/tasks/stream itself is tested with the broker in test_task_events.
+    """
+
+    @staticmethod
+    async def get_events(subscription) -> list[tuple[TaskEventType, list[int] | None]]:
+        events = []
+        while subscription.qsize():
+            event = await subscription.get()
+            events.append((event.type, event.task_ids))
+        return events
+
+    async def test_changes_are_published(self, user, auth_client, broker, user_factory):
+        subscription = await broker.subscribe(user.id)
+        another_user_subscription = await broker.subscribe((await user_factory()).id)
+
+        response = await auth_client.post(URL_BASE, json={"title": "title_1"})
+        task_id = response.json()["id"]
+        await auth_client.put(f"{URL_BASE}{task_id}", json={"is_done": True})
+        response = await auth_client.post(f"{URL_BASE}batch", json={"items": [{"title": "title_2"}]})
+        batch_id = response.json()["items"][0]["id"]
+        await auth_client.put(f"{URL_BASE}batch", json={"ids": [batch_id], "changes": {"is_done": True}})
+        await auth_client.post(f"{URL_BASE}import", content=json.dumps({"title": "title_3"}))
+        await auth_client.request("DELETE", f"{URL_BASE}batch", json={"ids": [batch_id]})
+        await auth_client.delete(f"{URL_BASE}{task_id}")
+        # nothing is changed
+        await auth_client.delete(f"{URL_BASE}{task_id}")
+
+        assert await self.get_events(subscription) == [
+            (TaskEventType.created, [task_id]),
+            (TaskEventType.updated, [task_id]),
+            (TaskEventType.created, [batch_id]),
+            (TaskEventType.updated, [batch_id]),
+            (TaskEventType.created, None),
+            (TaskEventType.deleted, [batch_id]),
+            (TaskEventType.deleted, [task_id]),
+        ]
+        assert another_user_subscription.qsize() == 0
+
+    async def test_stream_not_authenticated(self, client):
+        response = await client.get(f"{URL_BASE}stream")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+class TestSearchTasks:
+    """
+    Test GET /api/v1/tasks/search
+    Find current user's tasks by words, LIKE fallback is used by SQLite.
+    Authenticated user only.
+    """
+
+    @staticmethod
+    def get_url() -> str:
+        return f"{URL_BASE}search"
+
+    @staticmethod
+    async def add_tasks(session, user_id: int, texts: list[tuple[str, str | None]]) -> list[int]:
+        tasks = [TaskModel(title=title, description=description, user_id=user_id) for title, description in texts]
+        session.add_all(tasks)
+        await session.commit()
+        return [task.id for task in tasks]
+
+    async def test_search(self, session, user, auth_client, user_factory):
+        """
+        Test every word must match, title matches are the first, other users' tasks aren't found
+        """
+        ids = await self.add_tasks(session, user.id, [
+            ("buy milk", None),
+            ("groceries", "buy milk and bread"),
+            ("buy bread", "no milk"),
+            ("call mom", "about milk"),
+        ])
+        another_user = await user_factory()
+        await self.add_tasks(session, another_user.id, [("buy milk", None)])
+
+        response = await auth_client.get(self.get_url(), params={"q": "Milk buy"})
+        assert response.status_code == status.HTTP_200_OK
+
+        page = TasksPage.model_validate(response.json())
+        assert [task.id for task in page.items] == [ids[0], ids[2], ids[1]]
+        assert page.next_cursor is None
+
+    async def test_search_pagination(self, session, user, auth_client):
+        ids = await self.add_tasks(session, user.id, [(f"task {i}", None) for i in range(5)])
+
+        found_ids = []
+        cursor = None
+        for _ in range(3):
+            params = {"q": "task", "limit": 2}
+            if cursor is not None:
+                params["cursor"] = cursor
+            response = await auth_client.get(self.get_url(), params=params)
+            page = TasksPage.model_validate(response.json())
+            found_ids.extend(task.id for task in page.items)
+            cursor = page.next_cursor
+        assert cursor is None
+        assert found_ids == ids[::-1]
+
+    async def test_cursor_of_another_query(self, session, user, auth_client):
+        await self.add_tasks(session, user.id, [("task 1", None), ("task 2", None)])
+        response = await auth_client.get(self.get_url(), params={"q": "task", "limit": 1})
+        cursor = response.json()["next_cursor"]
+
+        response = await auth_client.get(self.get_url(), params={"q": "another", "cursor": cursor})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_like_wildcards_are_escaped(self, session, user, auth_client):
+        ids = await self.add_tasks(session, user.id, [("100% done", None), ("1000 done", None)])
+
+        response = await auth_client.get(self.get_url(), params={"q": "0%"})
+        assert [task["id"] for task in response.json()["items"]] == [ids[0]]
+
+    async def test_search_not_authenticated(self, client):
+        response = await client.get(self.get_url(), params={"q": "task"})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED